@@ -17,8 +17,11 @@ Advanced strategy tips:
   - You can analyze action frames by modifying on_action_frame function
 
   - The GameState.map object can be manually manipulated to create hypothetical 
-  board states. Though, we recommended making a copy of the map to preserve 
-  the actual current map state.
+  board states. Though, we recommended making a copy to preserve the actual 
+  current map state. GameState.fork() gives you a cheap copy-on-write copy.
+  Use add_unit and remove_unit, or edit the lists returned by game_map[x, y], 
+  so blocking and pathing see the change; changing a unit's attributes 
+  directly, such as its health, is not tracked.
 """
 
 class AlgoStrategy(gamelib.AlgoCore):
@@ -215,14 +218,14 @@ class AlgoStrategy(gamelib.AlgoCore):
         estimate the path's damage risk.
         """
         damages = []
+        threat_map = game_state.get_threat_map(0)
+        turret_damage = gamelib.GameUnit(TURRET, game_state.config).damage_i
         # Get the damage estimate each path will take
-        for location in location_options:
-            path = game_state.find_path_to_edge(location)
+        for path in game_state.find_paths_to_edge(location_options):
             damage = 0
             if path:
-                for path_location in path:
-                    # Get number of enemy turrets that can attack each location and multiply by turret damage
-                    damage += len(game_state.get_attackers(path_location, 0)) * gamelib.GameUnit(TURRET, game_state.config).damage_i
+                # Get number of enemy turrets that can attack each location and multiply by turret damage
+                damage = threat_map.path_attacker_count(path) * turret_damage
             damages.append(damage)
         
         # Now just return the location that takes the least damage
@@ -232,17 +235,17 @@ class AlgoStrategy(gamelib.AlgoCore):
         attacks = [[], []]
         # Get the damage estimate each path will take
         for i, attacker in enumerate([SCOUT, DEMOLISHER]):
-            for location in location_options:
-                path = game_state.find_path_to_edge(location)
+            attacker_unit = gamelib.GameUnit(attacker, game_state.config)
+            for path in game_state.find_paths_to_edge(location_options):
                 attack = 0
                 if path:
                     for path_location in path:
                         enemy_structure_in_range = False
-                        for attack_loc in game_state.game_map.get_locations_in_range(path_location, gamelib.GameUnit(attacker, game_state.config).attackRange):
+                        for attack_loc in game_state.game_map.get_locations_in_range(path_location, attacker_unit.attackRange):
                             if game_state.contains_stationary_unit(attack_loc) and game_state.contains_stationary_unit(attack_loc).player_index == 1:
                                 enemy_structure_in_range = True
                         if enemy_structure_in_range:
-                            attack += gamelib.GameUnit(attacker, game_state.config).damage_f * (3 if attacker == SCOUT else 8)
+                            attack += attacker_unit.damage_f * (3 if attacker == SCOUT else 8)
                 attacks[i].append(attack)
         
         return attacks
@@ -253,15 +256,14 @@ class AlgoStrategy(gamelib.AlgoCore):
                       game_state.game_map.get_edge_locations(game_state.game_map.TOP_RIGHT)
         
         all_paths = []
-        for location in enemy_edges:
-            path = game_state.find_path_to_edge(location)
+        threat_map = game_state.get_threat_map(1)
+        turret_damage = gamelib.GameUnit(TURRET, game_state.config).damage_i
+        for path in game_state.find_paths_to_edge(enemy_edges):
             all_paths.append(path)
             damage = 0
             if path:
-                for path_location in path:
-                    # Get number of enemy turrets that can attack each location and multiply by turret damage
-                    damage += len(game_state.get_attackers(path_location, 1)) * gamelib.GameUnit(TURRET,
-                                                                                                 game_state.config).damage_i
+                # Get number of enemy turrets that can attack each location and multiply by turret damage
+                damage = threat_map.path_attacker_count(path) * turret_damage
             damages.append(damage)
         if not damages:
             return []
@@ -276,11 +278,14 @@ class AlgoStrategy(gamelib.AlgoCore):
 
     def detect_enemy_unit(self, game_state, unit_type=None, valid_x = None, valid_y = None):
         total_units = 0
-        for location in game_state.game_map:
-            if game_state.contains_stationary_unit(location):
-                for unit in game_state.game_map[location]:
-                    if unit.player_index == 1 and (unit_type is None or unit.unit_type == unit_type) and (valid_x is None or location[0] in valid_x) and (valid_y is None or location[1] in valid_y):
-                        total_units += 1
+        if unit_type is None:
+            locations = game_state.game_map.iter_structures(1)
+        else:
+            locations = game_state.game_map.get_unit_locations(1, unit_type)
+        for location in locations:
+            for unit in game_state.game_map[location]:
+                if unit.player_index == 1 and (unit_type is None or unit.unit_type == unit_type) and (valid_x is None or location[0] in valid_x) and (valid_y is None or location[1] in valid_y):
+                    total_units += 1
         return total_units
 
     def on_action_frame(self, turn_string):
@@ -291,13 +296,14 @@ class AlgoStrategy(gamelib.AlgoCore):
         Full doc on format of a game frame at in json-docs.html in the root of the Starterkit.
         """
         # Let's record at what position we get scored on
-        state = json.loads(turn_string)
+        # AlgoCore passes a StateString that is already decoded, a plain string is parsed here
+        state = getattr(turn_string, "state", None) or json.loads(turn_string)
         events = state["events"]
         breaches = events["breach"]
         spawns = events["spawn"]
         damages = events["damage"]
         deaths = events["death"]
-        game_state = gamelib.GameState(self.config, turn_string)
+        game_state = gamelib.GameState(self.config, turn_string, lazy=True)
         for death in deaths:
             if death[1] in [0, 1, 2] and death[3] == 1 and not death[4]:
                 self.destroyed_locations.append(death[0])
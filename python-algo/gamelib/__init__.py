@@ -16,7 +16,22 @@ Investigating it is useful for advanced players interested in getting data from
 The Navigation class in navigation.py contains functions related to pathfinding, which are used by GameState in pathing related functions. 
 Investigating it is useful for advanced player who want to optimize the slow default pathing algorithm we provide. \n 
 
-util.py contains a small handful of functions that help with communication, including the debug-printing function, debug_write().
+geometry.py contains the ArenaGeometry lookup tables (bounds, edges, spawnable tiles and location indices) shared by the other modules. \n
+
+The Bitboard class in bitboard.py stores a set of locations as the bits of one int. 
+It is useful for fast pocket, flood fill and reachability checks over the whole board. \n
+
+The ThreatMap class in threat_map.py counts the units that can attack each tile and the damage they deal per frame. 
+It is useful for estimating the damage along many paths, see GameState.get_threat_map. \n
+
+The ShieldMap class in shield_map.py finds the supports that would shield a mobile unit on each tile. 
+It is useful for estimating the shield a unit picks up along a path, see GameState.get_shield_map. \n
+
+The StructureMap class in structure_map.py is the shared base of ThreatMap and ShieldMap. \n
+
+util.py contains a small handful of functions that help with communication, including the debug-printing function, debug_write(). \n
+
+vectorized.py computes distance fields and path lengths for many hypothetical boards at once. It needs NumPy, which is only imported when it is used.
 """
 
 from .algocore import AlgoCore
@@ -24,6 +39,9 @@ from .util import debug_write
 from .game_state import GameState
 from .unit import GameUnit
 from .game_map import GameMap
+from .bitboard import Bitboard
+from .threat_map import ThreatMap
+from .shield_map import ShieldMap
 
-__all__ = ["algocore", "game_state", "game_map", "navigation", "unit", "util"]
+__all__ = ["algocore", "bitboard", "game_state", "game_map", "geometry", "navigation", "shield_map", "structure_map", "threat_map", "unit", "util", "vectorized"]
  
\ No newline at end of file
@@ -1,7 +1,7 @@
 import json
 
 from .game_state import GameState
-from .util import get_command, debug_write, BANNER_TEXT, send_command
+from .util import get_command, debug_write, BANNER_TEXT, send_command, StateString
 
 class AlgoCore(object):
     """
@@ -26,7 +26,8 @@ class AlgoCore(object):
     def on_turn(self, game_state):
         """
         This step function is called at the start of each turn.
-        It is passed the current game state, which can be used to initiate a new GameState object. 
+        It is passed the current game state as a json string, which can be used to initiate a new GameState object. 
+        The string is a StateString whose state attribute holds it already decoded into a dict. 
         By default, it sends empty commands to the game engine. \n
         algo_strategy.py inherits from AlgoCore and overrides this on turn function. 
         Adjusting the on_turn function in algo_strategy is the main way to adjust your algo's logic. 
@@ -40,6 +41,7 @@ class AlgoCore(object):
         The action phase is made up of a sequence of distinct frames. 
         Each of these frames is sent to the algo in order. 
         They can be handled in this function. 
+        The frame is passed as a json string, a StateString whose state attribute holds it already decoded into a dict.
         """
         pass
 
@@ -65,6 +67,8 @@ class AlgoCore(object):
                 self.on_game_start(parsed_config)
             elif "turnInfo" in game_state_string:
                 state = json.loads(game_state_string)
+                # Hand the hooks the raw message, carrying the decoded dict so GameState does not parse it again
+                game_state_string = StateString(game_state_string, state)
                 stateType = int(state.get("turnInfo")[0])
                 if stateType == 0:
                     """
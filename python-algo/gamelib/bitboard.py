@@ -0,0 +1,358 @@
+from functools import lru_cache
+from .geometry import get_geometry, get_idealness_ranks
+
+
+class BitboardMasks:
+    """The bit masks used to shift bitboards of one arena size. Use get_masks to get the shared instance.
+
+    Attributes :
+        * arena_size (int): The size of the arena
+        * board (int): The bits of every location on the board
+        * not_top (int): The board without its top row of bit positions (y == arena_size - 1), which can be shifted up
+        * not_bottom (int): The board without its bottom row of bit positions (y == 0), which can be shifted down
+        * rows (tuple): For each y, the bits of that row
+        * edges (tuple): The bits of the four edges, in the order of GameMap.get_edges
+
+    """
+    def __init__(self, arena_size):
+        geometry = get_geometry(arena_size)
+        self.arena_size = arena_size
+        self.board = bits_of(geometry.indices)
+        self.not_top = self.board & ~bits_of(geometry.row_indices[arena_size - 1])
+        self.not_bottom = self.board & ~bits_of(geometry.row_indices[0])
+        self.rows = tuple(bits_of(row) for row in geometry.row_indices)
+        self.edges = tuple(bits_of(x * arena_size + y for x, y in edge) for edge in geometry.edges)
+
+
+def bits_of(indices):
+    """Gets the int with the bits of some flat location indices set
+    """
+    bits = 0
+    for index in indices:
+        bits |= 1 << index
+    return bits
+
+
+@lru_cache(maxsize=None)
+def get_masks(arena_size=28):
+    """Gets the shared BitboardMasks for an arena size
+    """
+    return BitboardMasks(arena_size)
+
+
+def mirror_bits(bits, arena_size=28):
+    """Mirrors a set of bits across the vertical center line of the arena, [x, y] becoming [ARENA_SIZE - 1 - x, y]
+    """
+    column = (1 << arena_size) - 1
+    mirrored = 0
+    for x in range(arena_size):
+        mirrored |= ((bits >> (x * arena_size)) & column) << ((arena_size - 1 - x) * arena_size)
+    return mirrored
+
+
+def neighbor_bits(bits, masks):
+    """Gets the bits of every location adjacent to one of the given bits, see Bitboard.neighbors
+    """
+    size = masks.arena_size
+    return ((bits & masks.not_top) << 1 | (bits & masks.not_bottom) >> 1 | bits << size | bits >> size) & masks.board
+
+
+def flood_fill_bits(seeds, free, masks, stop=0):
+    """Grows a set of bits through the free bits, one step in every direction at a time
+
+    Args:
+        seeds: The bits to grow from, seeds outside of free are dropped
+        free: The bits that may be filled
+        masks: The BitboardMasks of the arena
+        stop: If any of these bits is filled, return at once with the bits filled so far
+
+    Returns:
+        The bits of free connected to the seeds
+
+    """
+    size = masks.arena_size
+    not_top = masks.not_top
+    not_bottom = masks.not_bottom
+    filled = seeds & free
+    while not filled & stop:
+        grown = (filled | (filled & not_top) << 1 | (filled & not_bottom) >> 1 | filled << size | filled >> size) & free
+        if grown == filled:
+            break
+        filled = grown
+    return filled
+
+
+class Bitboard:
+    """A set of locations stored as the bits of one int, the bit of [x, y] being x * ARENA_SIZE + y
+    as given by GameMap.get_location_index. Set operations, neighbor expansion and flood fills work on
+    every location at once with a few big int operations, instead of looking at the tiles one by one.
+
+    Bitboards support &, |, ^ and - like sets, ~ gives the other locations of the board,
+    and len, in, iteration and comparison behave like a set of locations: <= and < test for a subset, >= and > for a superset.
+
+    Attributes :
+        * bits (int): The bits of the locations in the set
+        * arena_size (int): The size of the arena
+
+    """
+    __slots__ = ("bits", "arena_size")
+
+    def __init__(self, bits=0, arena_size=28):
+        """
+        Args:
+            bits: The bits of the locations, bits off the board are dropped
+            arena_size: The size of the arena
+
+        """
+        self.bits = bits & get_masks(arena_size).board
+        self.arena_size = arena_size
+
+    @classmethod
+    def from_locations(cls, locations, arena_size=28):
+        """Creates a bitboard holding some locations
+
+        Args:
+            locations: A list of [x, y] locations
+            arena_size: The size of the arena
+
+        """
+        return cls(bits_of(x * arena_size + y for x, y in locations), arena_size)
+
+    @classmethod
+    def from_game_map(cls, game_map):
+        """Creates a bitboard of the locations blocked by a structure on a GameMap
+
+        Args:
+            game_map: The GameMap to read the structures of
+
+        """
+        return cls(game_map.get_blocked_signature(), game_map.ARENA_SIZE)
+
+    @classmethod
+    def board(cls, arena_size=28):
+        """Creates a bitboard holding every location on the board
+        """
+        return cls(get_masks(arena_size).board, arena_size)
+
+    @classmethod
+    def edge(cls, edge, arena_size=28):
+        """Creates a bitboard holding the locations of one edge
+
+        Args:
+            edge: game_map.TOP_RIGHT, game_map.BOTTOM_LEFT, etc.
+            arena_size: The size of the arena
+
+        """
+        return cls(get_masks(arena_size).edges[edge], arena_size)
+
+    def neighbors(self):
+        """Gets the locations adjacent to at least one location of this bitboard.
+        A location of the bitboard is only included if it is adjacent to another one.
+
+        Returns:
+            A new Bitboard
+
+        """
+        return Bitboard(neighbor_bits(self.bits, get_masks(self.arena_size)), self.arena_size)
+
+    def mirror(self):
+        """Gets the mirror image of this bitboard across the vertical center line of the arena
+
+        Returns:
+            A new Bitboard
+
+        """
+        return Bitboard(mirror_bits(self.bits, self.arena_size), self.arena_size)
+
+    def flood_fill(self, seeds):
+        """Gets the locations of this bitboard connected to some seeds through this bitboard
+
+        Args:
+            seeds: A Bitboard or a list of [x, y] locations to fill from
+
+        Returns:
+            A new Bitboard, empty if none of the seeds are in this bitboard
+
+        """
+        if not isinstance(seeds, Bitboard):
+            seeds = Bitboard.from_locations(seeds, self.arena_size)
+        return Bitboard(flood_fill_bits(seeds.bits, self.bits, get_masks(self.arena_size)), self.arena_size)
+
+    def reaches(self, seeds, targets):
+        """Checks if some seeds are connected to some targets through this bitboard, stopping as soon as one is reached
+
+        Args:
+            seeds: A Bitboard or a list of [x, y] locations to fill from
+            targets: A Bitboard or a list of [x, y] locations to reach
+
+        Returns:
+            True if a target can be reached
+
+        """
+        if not isinstance(seeds, Bitboard):
+            seeds = Bitboard.from_locations(seeds, self.arena_size)
+        if not isinstance(targets, Bitboard):
+            targets = Bitboard.from_locations(targets, self.arena_size)
+        return bool(flood_fill_bits(seeds.bits, self.bits, get_masks(self.arena_size), targets.bits) & targets.bits)
+
+    def pockets(self):
+        """Splits this bitboard into its connected pockets
+
+        Returns:
+            A list of Bitboards, ordered by their lowest bit
+
+        """
+        masks = get_masks(self.arena_size)
+        pockets = []
+        remaining = self.bits
+        while remaining:
+            pocket = flood_fill_bits(remaining & -remaining, remaining, masks)
+            pockets.append(Bitboard(pocket, self.arena_size))
+            remaining &= ~pocket
+        return pockets
+
+    def __and__(self, other):
+        return Bitboard(self.bits & other.bits, self.arena_size)
+
+    def __or__(self, other):
+        return Bitboard(self.bits | other.bits, self.arena_size)
+
+    def __xor__(self, other):
+        return Bitboard(self.bits ^ other.bits, self.arena_size)
+
+    def __sub__(self, other):
+        return Bitboard(self.bits & ~other.bits, self.arena_size)
+
+    def __invert__(self):
+        return Bitboard(~self.bits, self.arena_size)
+
+    def __eq__(self, other):
+        return isinstance(other, Bitboard) and self.bits == other.bits and self.arena_size == other.arena_size
+
+    def __hash__(self):
+        return hash(self.bits)
+
+    def __le__(self, other):
+        if not isinstance(other, Bitboard):
+            return NotImplemented
+        return self.bits & ~other.bits == 0
+
+    def __lt__(self, other):
+        if not isinstance(other, Bitboard):
+            return NotImplemented
+        return self.bits != other.bits and self.bits & ~other.bits == 0
+
+    def __ge__(self, other):
+        if not isinstance(other, Bitboard):
+            return NotImplemented
+        return other.bits & ~self.bits == 0
+
+    def __gt__(self, other):
+        if not isinstance(other, Bitboard):
+            return NotImplemented
+        return self.bits != other.bits and other.bits & ~self.bits == 0
+
+    def __bool__(self):
+        return self.bits != 0
+
+    def __len__(self):
+        return bin(self.bits).count("1")
+
+    def __contains__(self, location):
+        x, y = location
+        return 0 <= x < self.arena_size and 0 <= y < self.arena_size and (self.bits >> (x * self.arena_size + y)) & 1 == 1
+
+    def __iter__(self):
+        """Iterates over the [x, y] locations of the bitboard, in flat index order
+        """
+        bits = self.bits
+        while bits:
+            low = bits & -bits
+            index = low.bit_length() - 1
+            yield [index // self.arena_size, index % self.arena_size]
+            bits ^= low
+
+    def __repr__(self):
+        return "Bitboard({} locations)".format(len(self))
+
+
+class Pockets:
+    """The connected pockets of free locations of one board, labeled lazily.
+    Use get_pockets to share the labeling of a board between every search on it.
+
+    A location is labeled the first time its pocket is asked for, by flood filling that whole pocket,
+    so later lookups of any location in the pocket are a list access.
+
+    Attributes :
+        * arena_size (int): The size of the arena
+        * blocked_bits (int): The bits of the blocked locations, see GameMap.get_blocked_signature
+        * labels (list): Indexed by flat index, the pocket of each labeled location, -1 if it is not labeled yet
+        * bits (list): The bits of each labeled pocket, in labeling order
+
+    """
+    def __init__(self, blocked_bits, arena_size=28):
+        """
+        Args:
+            blocked_bits: The bits of the blocked locations
+            arena_size: The size of the arena
+
+        """
+        self.arena_size = arena_size
+        self.blocked_bits = blocked_bits
+        self.labels = [-1] * (arena_size * arena_size)
+        self.bits = []
+        self._masks = get_masks(arena_size)
+        self._free = self._masks.board & ~blocked_bits
+        self._tiles = []
+        self._most_ideal = {}
+
+    def label(self, index):
+        """Gets the pocket of a free location, labeling its pocket if needed
+
+        Args:
+            index: The flat index of a free location
+
+        Returns:
+            The number of the pocket, an index into bits
+
+        """
+        pocket = self.labels[index]
+        if pocket < 0:
+            pocket = len(self.bits)
+            bits = flood_fill_bits(1 << index, self._free, self._masks)
+            tiles = tuple(tile for tile in get_geometry(self.arena_size).indices if bits >> tile & 1)
+            for tile in tiles:
+                self.labels[tile] = pocket
+            self.bits.append(bits)
+            self._tiles.append(tiles)
+        return pocket
+
+    def most_ideal(self, pocket, direction):
+        """Gets the most ideal location of a pocket for a unit heading towards an edge, see get_idealness_ranks
+
+        Args:
+            pocket: The number of a labeled pocket
+            direction: The (x, y) direction of the edge
+
+        Returns:
+            The flat index of the most ideal location
+
+        """
+        key = (pocket, direction)
+        index = self._most_ideal.get(key)
+        if index is None:
+            ranks = get_idealness_ranks(direction, self.arena_size)
+            index = self._most_ideal[key] = max(self._tiles[pocket], key=ranks.__getitem__)
+        return index
+
+
+@lru_cache(maxsize=16)
+def get_pockets(blocked_bits, arena_size=28):
+    """Gets the shared Pockets of a board
+
+    Args:
+        blocked_bits: The bits of the blocked locations, see GameMap.get_blocked_signature
+        arena_size: The size of the arena
+
+    """
+    return Pockets(blocked_bits, arena_size)
@@ -1,7 +1,59 @@
 import math
-from .unit import GameUnit
+from array import array
+from .unit import GameUnit, get_unit_stats
+from .geometry import get_geometry, get_range_indices, get_range_stencil
+from .bitboard import mirror_bits
 from .util import debug_write
 
+
+def _tracked(method):
+    """Wraps a list method of TileUnits so the map it belongs to sees the change, see GameMap._begin_tile_edit
+    """
+    def tracked(self, *args):
+        game_map = self._game_map
+        attached = game_map is not None and game_map._begin_tile_edit(self)
+        result = method(self, *args)
+        if attached:
+            game_map._end_tile_edit(self)
+        return result
+    tracked.__name__ = method.__name__
+    tracked.__doc__ = method.__doc__
+    return tracked
+
+
+class TileUnits(list):
+    """The list of units on one tile, as returned by game_map[x, y].
+
+    It is a list, and editing it with append, remove, clear, slicing and the other list methods keeps the
+    map's structure grids, unit index and observers in sync, and is undone by GameState.rollback.
+    A list read from a map that later replaced it, for example after the tile was rolled back, is
+    detached and editing it no longer changes the map.
+    """
+    __slots__ = ("_game_map", "_index")
+
+    def __init__(self, units=(), game_map=None, index=-1):
+        list.__init__(self, units)
+        self._game_map = game_map
+        self._index = index
+
+    def __reduce_ex__(self, protocol):
+        #Copies and pickles are plain lists, detached from the map
+        return (list, (list(self),))
+
+    append = _tracked(list.append)
+    extend = _tracked(list.extend)
+    insert = _tracked(list.insert)
+    remove = _tracked(list.remove)
+    pop = _tracked(list.pop)
+    clear = _tracked(list.clear)
+    sort = _tracked(list.sort)
+    reverse = _tracked(list.reverse)
+    __setitem__ = _tracked(list.__setitem__)
+    __delitem__ = _tracked(list.__delitem__)
+    __iadd__ = _tracked(list.__iadd__)
+    __imul__ = _tracked(list.__imul__)
+
+
 class GameMap:
     """Holds data about the current game map and provides functions
     useful for getting information related to the map.
@@ -9,6 +61,16 @@ class GameMap:
     game_map[x, y] will return a list of Units located at that location, 
     or an empty list if there are no units at the location
 
+    Alongside the unit lists, the map keeps flat structure grids (owner, type index,
+    upgraded flag and health) indexed by get_location_index. They are updated by add_unit,
+    remove_unit, GameState's parsing and edits of the lists returned by game_map[x, y] (see TileUnits),
+    so blocked checks never have to look at GameUnits. Changing the attributes of a GameUnit directly,
+    for example its health or calling its upgrade function, is not reflected in these grids;
+    use GameState.attempt_upgrade, or remove_unit and add_unit, instead.
+
+    When GameState parses lazily, tiles keep the raw unit entries sent by the engine and
+    their GameUnits are only built the first time the tile is read through game_map[x, y].
+
     Attributes :
         * config (JSON): Contains information about the current game rules
         * enable_warnings (bool): If true, debug messages for game_map functions will print out
@@ -18,6 +80,7 @@ class GameMap:
         * TOP_LEFT (int): A constant that represents the top left edge
         * BOTTOM_LEFT (int): Hidden challenge! Can you guess what this constant represents???
         * BOTTOM_RIGHT (int): A constant that represents the bottom right edge
+        * geometry (:obj: ArenaGeometry): Precomputed bounds, edge and spawn tables for this arena size
 
     """
     def __init__(self, config):
@@ -35,45 +98,602 @@ class GameMap:
         self.TOP_LEFT = 1
         self.BOTTOM_LEFT = 2
         self.BOTTOM_RIGHT = 3
+        self.geometry = get_geometry(self.ARENA_SIZE)
         self.__map = self.__empty_grid()
-        self.__start = [13,0]
+        self.__type_index = {unit["shorthand"]: i for i, unit in enumerate(config["unitInformation"]) if "shorthand" in unit}
+        tiles = self.ARENA_SIZE * self.ARENA_SIZE
+        self.__structure_owner = array('b', [-1]) * tiles
+        self.__structure_type = array('b', [-1]) * tiles
+        self.__structure_upgraded = array('b', [0]) * tiles
+        self.__structure_health = array('d', [0.0]) * tiles
+        self.__structure_indices = set()
+        self.__blocked_bits = 0
+        # (player_index, unit_type) -> {flat index: number of such units on that tile}
+        self.__unit_index = {}
+        self.__unit_counts = {}
+        # flat index -> the (player_index, unit_type) keys that tile currently adds to the unit index
+        self.__tile_keys = {}
+        self.__unit_stats = get_unit_stats(config)
+        self.__stationary_types = {unit_type for unit_type, stats in self.__unit_stats.items() if stats.stationary}
+        self.__pending = {}
+        self.__hit_radius = config["unitInformation"][0].get('getHitRadius', 0)
+        # Warm the stencil cache with every range the config can ask for
+        for unit in config["unitInformation"]:
+            for stats in (unit, unit.get("upgrade", {})):
+                for key in ("attackRange", "shieldRange", "selfDestructRange"):
+                    if key in stats:
+                        get_range_stencil(stats[key], self.__hit_radius)
+        # Indices of the tiles this map may mutate in place. None until the map is forked, meaning all of them.
+        self.__owned = None
+        # Undo log shared with GameState while a savepoint is active, see GameState.savepoint
+        self._journal = None
+        # Callbacks told the flat index of every tile whose units change, see add_observer
+        self.__observers = []
     
     def __getitem__(self, location):
         if len(location) == 2 and self.in_arena_bounds(location):
             x,y = location
-            return self.__map[x][y]
+            return self.__tile(x * self.ARENA_SIZE + y)
         self._invalid_coordinates(location)
 
+    def __tile(self, index):
+        """Gets the units of a tile as a TileUnits owned by this map, for handing out GameUnits that may be mutated
+        """
+        if index in self.__pending:
+            self.__materialize(index)
+        units = self.__map[index]
+        attached = type(units) is TileUnits and units._game_map is self
+        if self.__owned is not None and index not in self.__owned:
+            # The GameUnits are still shared with a fork or the undo journal, so hand out private copies
+            copies = [self.__copy_unit(unit) for unit in units]
+            if attached:
+                list.__setitem__(units, slice(None), copies)
+            else:
+                units = self.__map[index] = TileUnits(copies, self, index)
+            self.__owned.add(index)
+        elif not attached:
+            units = self.__map[index] = TileUnits(units, self, index)
+        return units
+
+    def _begin_tile_edit(self, units):
+        """Called by TileUnits before one of its list methods changes it. Returns False if it is detached from this map.
+        """
+        index = units._index
+        if self.__map[index] is not units:
+            return False
+        if self._journal is not None:
+            self.__record(index, list(units))
+        return True
+
+    def _end_tile_edit(self, units):
+        """Called by TileUnits after one of its list methods changed it, to bring the grids, index and observers up to date
+        """
+        index = units._index
+        self.__update_structure_grids(index)
+        self.__reindex(index)
+        self.__notify(index)
+
     def __setitem__(self, location, val):
         if type(location) == tuple and len(location) == 2 and self.in_arena_bounds(location):
-            self.__map[location[0]][location[1]] = val
+            self.__replace(location[0] * self.ARENA_SIZE + location[1], val)
             return
         self._invalid_coordinates(location)
 
     def __iter__(self):
-        self.__start = [13,0]
-        return self
-    
-    def __next__(self):
-        location = self.__start
-        if location == [15,27]:
-            raise StopIteration
-        new_location = [location[0]+1, location[1]]
-        while not self.in_arena_bounds(new_location) and not location == [14,27]:
-            if new_location[0] == self.ARENA_SIZE:
-                new_location = [0, new_location[1]+1]
-            else:
-                new_location = [new_location[0]+1, new_location[1]]
-        self.__start = new_location
-        return location 
+        return ([x, y] for x, y in self.geometry.locations)
+
+    def __iter_indices(self, indices):
+        size = self.ARENA_SIZE
+        return ([index // size, index % size] for index in indices)
+
+    def iter_my_half(self):
+        """Iterates over the locations on your half of the board (y < HALF_ARENA), row by row from the bottom
+        """
+        return self.__iter_indices(self.geometry.half_indices[0])
+
+    def iter_enemy_half(self):
+        """Iterates over the locations on your opponent's half of the board (y >= HALF_ARENA), row by row from the bottom
+        """
+        return self.__iter_indices(self.geometry.half_indices[1])
+
+    def iter_rows(self, y_min, y_max):
+        """Iterates over the locations of the rows y_min to y_max (inclusive), row by row from the bottom
+
+        Args:
+            y_min: The lowest row
+            y_max: The highest row
+
+        """
+        rows = self.geometry.row_indices[max(y_min, 0):max(y_max + 1, 0)]
+        return self.__iter_indices(index for row in rows for index in row)
+
+    def iter_columns(self, x_min, x_max):
+        """Iterates over the locations of the columns x_min to x_max (inclusive), row by row from the bottom
+
+        Args:
+            x_min: The leftmost column
+            x_max: The rightmost column
+
+        """
+        columns = self.geometry.column_indices[max(x_min, 0):max(x_max + 1, 0)]
+        indices = sorted((index for column in columns for index in column), key=self.geometry.board_order.__getitem__)
+        return self.__iter_indices(indices)
+
+    def iter_structures(self, player_index=None):
+        """Iterates over the locations holding a structure, row by row from the bottom.
+        Only the tiles that hold a structure are visited.
+
+        Args:
+            player_index: If given, only the structures of this player, 0 for you 1 for the enemy
+
+        """
+        owners = self.__structure_owner
+        indices = sorted(self.__structure_indices, key=self.geometry.board_order.__getitem__)
+        if player_index is not None:
+            indices = [index for index in indices if owners[index] == player_index]
+        return self.__iter_indices(indices)
 
     def __empty_grid(self):
-        grid = []
-        for x in range(0, self.ARENA_SIZE):
-            grid.append([])
-            for _ in range(0, self.ARENA_SIZE):
-                grid[x].append([])
-        return grid
+        return [[] for _ in range(self.ARENA_SIZE * self.ARENA_SIZE)]
+
+    def __update_structure_grids(self, index):
+        """Rewrites the structure grid entries of one tile from its unit list, or its raw entries if it is still pending
+        """
+        if index in self.__pending:
+            for unit_type, player_index, health, upgraded, _ in self.__pending[index]:
+                if unit_type in self.__stationary_types:
+                    type_index = self.__type_index[unit_type]
+                    self.__structure_owner[index] = player_index
+                    self.__structure_type[index] = type_index
+                    self.__structure_upgraded[index] = upgraded
+                    self.__structure_health[index] = health or self.__unit_stats[unit_type].max_health
+                    self.__mark_blocked(index)
+                    return
+        else:
+            for unit in self.__map[index]:
+                if unit.stationary:
+                    self.__structure_owner[index] = unit.player_index
+                    self.__structure_type[index] = self.__type_index[unit.unit_type]
+                    self.__structure_upgraded[index] = unit.upgraded
+                    self.__structure_health[index] = unit.health
+                    self.__mark_blocked(index)
+                    return
+        self.__structure_owner[index] = -1
+        self.__structure_type[index] = -1
+        self.__structure_upgraded[index] = 0
+        self.__structure_health[index] = 0.0
+        self.__mark_unblocked(index)
+
+    def __mark_blocked(self, index):
+        if index not in self.__structure_indices:
+            self.__structure_indices.add(index)
+            self.__blocked_bits |= 1 << index
+
+    def __mark_unblocked(self, index):
+        if index in self.__structure_indices:
+            self.__structure_indices.discard(index)
+            self.__blocked_bits &= ~(1 << index)
+
+    def __reindex(self, index):
+        """Brings the per player, per type unit index up to date with the contents of one tile
+        """
+        if index in self.__pending:
+            keys = tuple((entry[1], entry[0]) for entry in self.__pending[index])
+        else:
+            keys = tuple((unit.player_index, unit.unit_type) for unit in self.__map[index])
+        old_keys = self.__tile_keys.get(index, ())
+        if keys == old_keys:
+            return
+        for key in old_keys:
+            tiles = self.__unit_index[key]
+            tiles[index] -= 1
+            if not tiles[index]:
+                del tiles[index]
+            self.__unit_counts[key] -= 1
+        for key in keys:
+            tiles = self.__unit_index.setdefault(key, {})
+            tiles[index] = tiles.get(index, 0) + 1
+            self.__unit_counts[key] = self.__unit_counts.get(key, 0) + 1
+        if keys:
+            self.__tile_keys[index] = keys
+        else:
+            self.__tile_keys.pop(index, None)
+
+    def __record(self, index, units=None):
+        """Appends the current state of a tile to the undo journal. units is a copy of its unit list if the list itself is about to change
+        """
+        if units is None:
+            units = self.__map[index]
+            if type(units) is TileUnits:
+                # Keep a plain copy, so edits through a TileUnits the map later replaced cannot reach the journal
+                units = list(units)
+        self._journal.append(("tile", index, units, self.__pending.get(index),
+            self.__structure_owner[index], self.__structure_type[index],
+            self.__structure_upgraded[index], self.__structure_health[index]))
+
+    def _undo(self, entry):
+        """Restores a tile recorded in the undo journal. Used by GameState.rollback.
+        """
+        _, index, units, pending, owner, type_index, upgraded, health = entry
+        self.__map[index] = units
+        if pending is None:
+            self.__pending.pop(index, None)
+        else:
+            self.__pending[index] = pending
+        self.__structure_owner[index] = owner
+        self.__structure_type[index] = type_index
+        self.__structure_upgraded[index] = upgraded
+        self.__structure_health[index] = health
+        if owner >= 0:
+            self.__mark_blocked(index)
+        else:
+            self.__mark_unblocked(index)
+        self.__reindex(index)
+        # The restored tile may still be referenced by an older journal entry or a fork, so copy it before its next write
+        if self.__owned is None:
+            self.__owned = set(range(len(self.__map)))
+        self.__owned.discard(index)
+        self.__notify(index)
+
+    def __replace(self, index, units):
+        """Replaces the whole unit list of a tile
+        """
+        if self._journal is not None:
+            self.__record(index)
+        self.__pending.pop(index, None)
+        self.__map[index] = units
+        if self.__owned is not None:
+            self.__owned.add(index)
+        self.__update_structure_grids(index)
+        self.__reindex(index)
+        self.__notify(index)
+
+    def __notify(self, index):
+        for observer in self.__observers:
+            observer(index)
+
+    def add_observer(self, observer):
+        """Registers a callback told about every change to the units of a tile, to keep derived data up to date
+        without rescanning the board. It is called with the flat index of the tile (see get_location_index) after
+        the change, including changes made by GameState, add_unit, remove_unit and rollbacks.
+        Forks of this map start without observers.
+
+        Args:
+            observer: A function taking a flat location index
+
+        """
+        self.__observers.append(observer)
+
+    def remove_observer(self, observer):
+        """Unregisters a callback added with add_observer
+        """
+        self.__observers.remove(observer)
+
+    def __writable(self, index):
+        """Makes a tile safe to mutate in place, copying it first if it is still shared with a forked map
+        or needed by the undo journal
+        """
+        if self._journal is not None:
+            self.__record(index)
+        elif self.__owned is None or index in self.__owned:
+            return
+        if index in self.__pending:
+            self.__pending[index] = [list(entry) for entry in self.__pending[index]]
+        self.__map[index] = [self.__copy_unit(unit) for unit in self.__map[index]]
+        if self.__owned is not None:
+            self.__owned.add(index)
+
+    @staticmethod
+    def __copy_unit(unit):
+        copy = GameUnit.from_stats(unit.stats, unit.player_index, unit.health, unit.x, unit.y)
+        copy.pending_removal = unit.pending_removal
+        copy.upgraded = unit.upgraded
+        return copy
+
+    def fork(self):
+        """Creates a copy-on-write copy of this map
+
+        The new map shares every tile with this one. Whichever map writes to a tile through add_unit,
+        remove_unit or GameState first copies it, and game_map[x, y] copies the GameUnits of a shared tile
+        before returning them, so the other map never sees the change.
+
+        Returns:
+            A new GameMap holding the same units as this one
+
+        """
+        child = GameMap.__new__(GameMap)
+        child.__dict__.update(self.__dict__)
+        # The lists handed out by game_map[x, y] stay with this map, the child gets plain copies of them
+        child.__map = [list(units) if type(units) is TileUnits else units for units in self.__map]
+        child.__pending = dict(self.__pending)
+        child.__structure_owner = self.__structure_owner[:]
+        child.__structure_type = self.__structure_type[:]
+        child.__structure_upgraded = self.__structure_upgraded[:]
+        child.__structure_health = self.__structure_health[:]
+        child.__structure_indices = set(self.__structure_indices)
+        child.__unit_index = {key: dict(tiles) for key, tiles in self.__unit_index.items()}
+        child.__unit_counts = dict(self.__unit_counts)
+        child.__tile_keys = dict(self.__tile_keys)
+        child.__owned = set()
+        child._journal = None
+        child.__observers = []
+        self.__owned = set()
+        return child
+
+    def __materialize(self, index):
+        """Builds the GameUnits of a pending tile from its raw entries
+        """
+        x, y = divmod(index, self.ARENA_SIZE)
+        # The tile holds the same units before and after, so this is not journaled, which also keeps observers
+        # reading tiles during GameState.rollback from adding to the journal being undone. The old list may still
+        # be shared with a fork or the journal, so the units go in a new one.
+        units = self.__map[index]
+        if self.__owned is not None and index not in self.__owned:
+            units = [self.__copy_unit(unit) for unit in units]
+            self.__owned.add(index)
+        else:
+            units = list(units)
+        self.__map[index] = units
+        for unit_type, player_index, health, upgraded, pending_removal in self.__pending.pop(index):
+            stats = self.__unit_stats[unit_type]
+            unit = GameUnit.from_stats(stats.upgraded_stats if upgraded else stats, player_index, health, x, y)
+            unit.pending_removal = pending_removal
+            list.append(units, unit)
+
+    def _place_unit(self, unit):
+        """Appends an already built GameUnit to its tile. Used by GameState when parsing.
+        """
+        index = unit.x * self.ARENA_SIZE + unit.y
+        if index in self.__pending:
+            self.__materialize(index)
+        self.__writable(index)
+        list.append(self.__map[index], unit)
+        if unit.stationary:
+            self.__update_structure_grids(index)
+        self.__reindex(index)
+        self.__notify(index)
+
+    def _place_raw_units(self, units, player_index):
+        """Records units on their tiles without building their GameUnits. Used by GameState when parsing lazily.
+
+        The structure grids and the unit index are filled in one pass, without the per tile bookkeeping of add_unit,
+        so this must only be called on a new map whose units are all pending, that is not forked, journaled or observed.
+
+        Args:
+            units: (unit_type, entries) pairs, entries being the [x, y, health, ...] lists of the game state for that type
+            player_index: The player controlling the units
+
+        """
+        size = self.ARENA_SIZE
+        pending = self.__pending
+        owners = self.__structure_owner
+        types = self.__structure_type
+        healths = self.__structure_health
+        structure_indices = self.__structure_indices
+        tile_keys = self.__tile_keys
+        blocked_bits = 0
+        for unit_type, entries in units:
+            if not entries:
+                continue
+            key = (player_index, unit_type)
+            keys = (key,)
+            tiles = self.__unit_index.setdefault(key, {})
+            stationary = unit_type in self.__stationary_types
+            type_index = self.__type_index[unit_type]
+            max_health = self.__unit_stats[unit_type].max_health
+            for entry in entries:
+                index = int(entry[0]) * size + int(entry[1])
+                health = float(entry[2])
+                pending.setdefault(index, []).append([unit_type, player_index, health, False, False])
+                tiles[index] = tiles.get(index, 0) + 1
+                tile_keys[index] = tile_keys[index] + keys if index in tile_keys else keys
+                # Like __update_structure_grids, the first structure of a tile is the one in the grids
+                if stationary and owners[index] < 0:
+                    owners[index] = player_index
+                    types[index] = type_index
+                    healths[index] = health or max_health
+                    structure_indices.add(index)
+                    blocked_bits |= 1 << index
+            self.__unit_counts[key] = self.__unit_counts.get(key, 0) + len(entries)
+        self.__blocked_bits |= blocked_bits
+
+    def _upgrade_structure(self, x, y):
+        """Upgrades the structure at x, y. Returns True if there was a structure to upgrade.
+        """
+        index = x * self.ARENA_SIZE + y
+        if self.__structure_owner[index] < 0:
+            return False
+        self.__writable(index)
+        if index in self.__pending:
+            for entry in self.__pending[index]:
+                if entry[0] in self.__stationary_types:
+                    entry[3] = True
+                    break
+        else:
+            self.get_structure(index).upgrade()
+        self.__update_structure_grids(index)
+        self.__notify(index)
+        return True
+
+    def _mark_removal(self, x, y):
+        """Flags the first unit at x, y as pending removal if the tile holds a structure
+        """
+        index = x * self.ARENA_SIZE + y
+        if self.__structure_owner[index] < 0:
+            return
+        self.__writable(index)
+        if index in self.__pending:
+            self.__pending[index][0][4] = True
+        else:
+            self.__map[index][0].pending_removal = True
+
+    def get_location_index(self, location):
+        """Gets the flat index of a location in the structure grids
+
+        Args:
+            location: A map location
+
+        Returns:
+            x * ARENA_SIZE + y, the index of the location in the arrays returned by the get_structure_* functions
+
+        """
+        x, y = location
+        return x * self.ARENA_SIZE + y
+
+    def is_blocked(self, location):
+        """Checks if a structure stands on the given location, without looking at any GameUnit.
+
+        Args:
+            location: A map location inside the arena
+
+        Returns:
+            True if the location holds a structure, False otherwise
+
+        """
+        x, y = location
+        return self.__structure_owner[x * self.ARENA_SIZE + y] >= 0
+
+    def get_structure(self, index):
+        """Gets the structure at a flat location index
+
+        Args:
+            index: A flat location index, see get_location_index
+
+        Returns:
+            The structure GameUnit at that index, or None if there is none
+
+        """
+        if self.__structure_owner[index] < 0:
+            return None
+        for unit in self.__tile(index):
+            if unit.stationary:
+                return unit
+        return None
+
+    def count_units(self, player_index, unit_type):
+        """Counts the units of one type controlled by a player, in constant time
+
+        Args:
+            player_index: The player controlling the units, 0 for you 1 for the enemy
+            unit_type: The type of the units
+
+        Returns:
+            The number of such units on the map
+
+        """
+        return self.__unit_counts.get((player_index, unit_type), 0)
+
+    def get_unit_locations(self, player_index, unit_type):
+        """Gets the locations of the units of one type controlled by a player.
+        Takes time proportional to the number of such units, not to the size of the board.
+
+        Args:
+            player_index: The player controlling the units, 0 for you 1 for the enemy
+            unit_type: The type of the units
+
+        Returns:
+            A list of [x, y] locations, one per tile holding at least one such unit
+
+        """
+        size = self.ARENA_SIZE
+        return [[index // size, index % size] for index in self.__unit_index.get((player_index, unit_type), ())]
+
+    def get_unit_coordinates(self, player_index, unit_type):
+        """Like get_unit_locations, but returns coordinate arrays, with one entry per unit
+
+        Args:
+            player_index: The player controlling the units, 0 for you 1 for the enemy
+            unit_type: The type of the units
+
+        Returns:
+            (xs, ys), two array('b') of the x and y coordinates of every such unit
+
+        """
+        size = self.ARENA_SIZE
+        xs = array('b')
+        ys = array('b')
+        for index, count in self.__unit_index.get((player_index, unit_type), {}).items():
+            xs.extend([index // size] * count)
+            ys.extend([index % size] * count)
+        return xs, ys
+
+    def iter_units(self, player_index, unit_type):
+        """Iterates over the GameUnits of one type controlled by a player, visiting only the tiles that hold them
+
+        Args:
+            player_index: The player controlling the units, 0 for you 1 for the enemy
+            unit_type: The type of the units
+
+        """
+        for location in self.get_unit_locations(player_index, unit_type):
+            for unit in self[location]:
+                if unit.player_index == player_index and unit.unit_type == unit_type:
+                    yield unit
+
+    def get_blocked_signature(self):
+        """Gets a signature of which tiles are blocked by structures, for use as a cache key.
+        Boards with the same blocked tiles have equal signatures, whoever owns the structures.
+
+        Returns:
+            An int with the bit of every blocked tile's flat index (see get_location_index) set
+
+        """
+        return self.__blocked_bits
+
+    def get_canonical_signature(self):
+        """Gets a signature of the blocked tiles that is the same for a board and its mirror image, for use as a cache key.
+        The board is mirrored across the vertical center line, the left and right halves swapping places.
+
+        Returns:
+            A tuple (signature, mirrored). signature is the smaller of get_blocked_signature() and the signature of the
+            mirrored board, mirrored is True if it is the mirrored one, meaning results cached under it must be mirrored back.
+            A board that is its own mirror image has mirrored False.
+
+        """
+        mirrored = mirror_bits(self.__blocked_bits, self.ARENA_SIZE)
+        if mirrored < self.__blocked_bits:
+            return mirrored, True
+        return self.__blocked_bits, False
+
+    def get_structure_owners(self):
+        """Gets the structure owner grid
+
+        Returns:
+            A flat array('b') of ARENA_SIZE * ARENA_SIZE entries, indexed by get_location_index.
+            Each entry is the player index owning the structure on that tile, or -1 if the tile holds no structure.
+            The array is owned by the map and should be treated as read only.
+
+        """
+        return self.__structure_owner
+
+    def get_structure_types(self):
+        """Gets the structure type grid
+
+        Returns:
+            A flat array('b') indexed by get_location_index holding the index of each structure's
+            type in config["unitInformation"], or -1 if the tile holds no structure. Read only.
+
+        """
+        return self.__structure_type
+
+    def get_structure_upgrades(self):
+        """Gets the structure upgrade grid
+
+        Returns:
+            A flat array('b') indexed by get_location_index holding 1 where an upgraded structure stands, 0 otherwise. Read only.
+
+        """
+        return self.__structure_upgraded
+
+    def get_structure_health(self):
+        """Gets the structure health grid
+
+        Returns:
+            A flat array('d') indexed by get_location_index holding the health each structure had when it was
+            parsed or added, 0.0 where there is no structure. Read only.
+
+        """
+        return self.__structure_health
 
     def _invalid_coordinates(self, location):
         self.warn("{} is out of bounds.".format(str(location)))
@@ -89,6 +709,9 @@ class GameMap:
         
         """
         x, y = location
+        if type(x) is int and type(y) is int:
+            return 0 <= x < self.ARENA_SIZE and 0 <= y < self.ARENA_SIZE and self.geometry.bounds[x * self.ARENA_SIZE + y] == 1
+
         half_board = self.HALF_ARENA
 
         row_size = y + 1
@@ -117,8 +740,7 @@ class GameMap:
             self.warn("Passed invalid quadrant_description '{}'. See the documentation for valid inputs for get_edge_locations.".format(quadrant_description))
             return
 
-        edges = self.get_edges()
-        return edges[quadrant_description]
+        return [list(location) for location in self.geometry.edges[quadrant_description]]
 
     def get_edges(self):
         """Gets all of the edges and their edge locations
@@ -127,27 +749,7 @@ class GameMap:
             A list with four lists inside of it of locations corresponding to the four edges.
             [0] = top_right, [1] = top_left, [2] = bottom_left, [3] = bottom_right.
         """
-        top_right = []
-        for num in range(0, self.HALF_ARENA):
-            x = self.HALF_ARENA + num
-            y = self.ARENA_SIZE - 1 - num
-            top_right.append([int(x), int(y)])
-        top_left = []
-        for num in range(0, self.HALF_ARENA):
-            x = self.HALF_ARENA - 1 - num
-            y = self.ARENA_SIZE - 1 - num
-            top_left.append([int(x), int(y)])
-        bottom_left = []
-        for num in range(0, self.HALF_ARENA):
-            x = self.HALF_ARENA - 1 - num
-            y = num
-            bottom_left.append([int(x), int(y)])
-        bottom_right = []
-        for num in range(0, self.HALF_ARENA):
-            x = self.HALF_ARENA + num
-            y = num
-            bottom_right.append([int(x), int(y)])
-        return [top_right, top_left, bottom_left, bottom_right]
+        return [[list(location) for location in edge] for edge in self.geometry.edges]
     
     def add_unit(self, unit_type, location, player_index=0):
         """Add a single GameUnit to the map at the given location.
@@ -167,11 +769,17 @@ class GameMap:
             self.warn("Player index {} is invalid. Player index should be 0 or 1.".format(player_index))
 
         x, y = location
-        new_unit = GameUnit(unit_type, self.config, player_index, None, location[0], location[1])
+        index = x * self.ARENA_SIZE + y
+        new_unit = GameUnit.from_stats(self.__unit_stats[unit_type], player_index, None, location[0], location[1])
+        if index in self.__pending:
+            self.__materialize(index)
         if not new_unit.stationary:
-            self.__map[x][y].append(new_unit)
+            self.__writable(index)
+            list.append(self.__map[index], new_unit)
+            self.__reindex(index)
+            self.__notify(index)
         else:
-            self.__map[x][y] = [new_unit]
+            self.__replace(index, [new_unit])
 
     def remove_unit(self, location):
         """Remove all units on the map in the given location.
@@ -186,7 +794,7 @@ class GameMap:
             self._invalid_coordinates(location)
         
         x, y = location
-        self.__map[x][y] = []
+        self.__replace(x * self.ARENA_SIZE + y, [])
 
     def get_locations_in_range(self, location, radius):
         """Gets locations in a circular area around a location
@@ -205,9 +813,20 @@ class GameMap:
             self._invalid_coordinates(location)
 
         x, y = location
+        if type(x) is int and type(y) is int:
+            size = self.ARENA_SIZE
+            bounds = self.geometry.bounds
+            locations = []
+            for dx, dy in get_range_stencil(radius, self.__hit_radius):
+                i = x + dx
+                j = y + dy
+                if 0 <= i < size and 0 <= j < size and bounds[i * size + j]:
+                    locations.append([i, j])
+            return locations
+
         locations = []
         search_radius = math.ceil(radius)
-        getHitRadius = self.config["unitInformation"][0]['getHitRadius']
+        getHitRadius = self.__hit_radius
         for i in range(int(x - search_radius), int(x + search_radius + 1)):
             for j in range(int(y - search_radius), int(y + search_radius + 1)):
                 new_location = [i, j]
@@ -216,6 +835,31 @@ class GameMap:
                     locations.append(new_location)
         return locations
 
+    def get_indices_in_range(self, location, radius):
+        """Like get_locations_in_range, but returns flat location indices (see get_location_index) instead of locations.
+        The location must have integer coordinates.
+
+        Args:
+            location: The center of our search area
+            radius: The radius of our search area
+
+        Returns:
+            An array('H') of the flat indices of the locations within our search area, in the same order as get_locations_in_range
+
+        """
+        x, y = location
+        size = self.ARENA_SIZE
+        bounds = self.geometry.bounds
+        if 0 <= x < size and 0 <= y < size and bounds[x * size + y]:
+            return array('H', get_range_indices(x * size + y, radius, self.__hit_radius, size))
+        indices = array('H')
+        for dx, dy in get_range_stencil(radius, self.__hit_radius):
+            i = x + dx
+            j = y + dy
+            if 0 <= i < size and 0 <= j < size and bounds[i * size + j]:
+                indices.append(i * size + j)
+        return indices
+
     def distance_between_locations(self, location_1, location_2):
         """Euclidean distance
 
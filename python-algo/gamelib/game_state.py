@@ -2,10 +2,12 @@ import math
 import json
 import sys
 
-from .navigation import ShortestPathFinder
+from .navigation import ShortestPathFinder, IncrementalPathfinder
 from .util import send_command, debug_write
-from .unit import GameUnit
+from .unit import GameUnit, get_unit_stats
 from .game_map import GameMap
+from .threat_map import ThreatMap
+from .shield_map import ShieldMap
 
 def is_stationary(unit_type):
     """
@@ -47,17 +49,26 @@ class GameState:
 
     """
 
-    def __init__(self, config, serialized_string):
+    def __init__(self, config, serialized_string, lazy=False):
         """ Setup a turns variables using arguments passed
 
         Args:
             * config (JSON): A json object containing information about the game
-            * serialized_string (string): A string containing information about the game state at the start of this turn
+            * serialized_string (string or dict): A string containing information about the game state at the start of this turn,
+              or the dict it decodes to. AlgoCore passes a StateString carrying the decoded dict, so the message is only parsed once.
+            * lazy (bool): If true, GameUnits are only built the first time their tile is read through game_map[x, y].
+              Blocked checks, pathing and resources never need them, so this is much cheaper for action frames.
 
         """
-        self.serialized_string = serialized_string
+        if isinstance(serialized_string, str):
+            self._serialized_string = serialized_string
+            self._state = getattr(serialized_string, "state", None)
+        else:
+            self._serialized_string = None
+            self._state = serialized_string
         self.config = config
         self.enable_warnings = True
+        self.lazy = lazy
 
         global WALL, SUPPORT, TURRET, SCOUT, DEMOLISHER, INTERCEPTOR, REMOVE, UPGRADE, STRUCTURE_TYPES, ALL_UNITS, UNIT_TYPE_TO_INDEX
         UNIT_TYPE_TO_INDEX = {}
@@ -96,14 +107,27 @@ class GameState:
         self._player_resources = [
                 {'SP': 0, 'MP': 0},  # player 0, which is you
                 {'SP': 0, 'MP': 0}]  # player 1, which is the opponent
-        self.__parse_state(serialized_string)
+        self._undo_log = None
+        # player_index -> ThreatMap or ShieldMap kept up to date by observing game_map, see get_threat_map and get_shield_map
+        self._threat_maps = {}
+        self._shield_maps = {}
+        self._max_attack_range = max(unit.get('attackRange', 0) for unit in self.config["unitInformation"])
+        self.__parse_state(self._state if self._state is not None else serialized_string)
+
+    @property
+    def serialized_string(self):
+        """The game state this GameState was parsed from, as a json string. Encoded on first use if it was given as a dict.
+        """
+        if self._serialized_string is None:
+            self._serialized_string = json.dumps(self._state)
+        return self._serialized_string
 
     def __parse_state(self, state_line):
         """
         Fills in map based on the serialized game state so that self.game_map[x,y] is a list of GameUnits at that location.
-        state_line is the game state as a json string.
+        state_line is the game state as a json string, or the dict it decodes to.
         """
-        state = json.loads(state_line)
+        state = json.loads(state_line) if isinstance(state_line, str) else state_line
 
         turn_info = state["turnInfo"]
         self.turn_number = int(turn_info[1])
@@ -131,23 +155,108 @@ class GameState:
         Helper function for __parse_state to add units to the map.
         """
         typedef = self.config.get("unitInformation")
+        unit_stats = get_unit_stats(self.config)
+        if self.lazy:
+            # Record every unit in one pass, leaving only the removals and upgrades to the loop below
+            typed_units = [(typedef[i].get("shorthand"), unit_types) for i, unit_types in enumerate(units)]
+            self.game_map._place_raw_units([(unit_type, unit_types) for unit_type, unit_types in typed_units
+                                            if unit_type != REMOVE and unit_type != UPGRADE], player_number)
+            units = [unit_types if unit_type == REMOVE or unit_type == UPGRADE else () for unit_type, unit_types in typed_units]
         for i, unit_types in enumerate(units):
+            unit_type = typedef[i].get("shorthand")
             for uinfo in unit_types:
-                unit_type = typedef[i].get("shorthand")
                 sx, sy, shp = uinfo[:3]
                 x, y = map(int, [sx, sy])
                 hp = float(shp)
                 # This depends on RM and UP always being the last types to be processed
                 if unit_type == REMOVE:
                     # Quick fix will deploy engine fix soon
-                    if self.contains_stationary_unit([x,y]):
-                        self.game_map[x,y][0].pending_removal = True
+                    self.game_map._mark_removal(x, y)
                 elif unit_type == UPGRADE:
-                    if self.contains_stationary_unit([x,y]):
-                        self.game_map[x,y][0].upgrade()
+                    self.game_map._upgrade_structure(x, y)
                 else:
-                    unit = GameUnit(unit_type, self.config, player_number, hp, x, y)
-                    self.game_map[x,y].append(unit)
+                    unit = GameUnit.from_stats(unit_stats[unit_type], player_number, hp, x, y)
+                    self.game_map._place_unit(unit)
+
+    def fork(self):
+        """Creates a copy of this GameState to build hypothetical boards on
+
+        The fork shares the config and every map tile with this state, and tiles are only copied
+        when one of the two states writes to them, so forking costs about the same however many
+        units are on the board. Resources and the build and deploy stacks are small and are copied.
+        Spawning, removing or upgrading on the fork never affects this state, and vice versa.
+        Do not call submit_turn on a fork unless you want to send its moves instead of this state's.
+
+        Returns:
+            A new GameState with the same board, resources and pending moves as this one
+
+        """
+        child = GameState.__new__(GameState)
+        child.__dict__.update(self.__dict__)
+        child.game_map = self.game_map.fork()
+        child._shortest_path_finder = ShortestPathFinder(self._shortest_path_finder.path_cache)
+        child._build_stack = list(self._build_stack)
+        child._deploy_stack = list(self._deploy_stack)
+        child._player_resources = [dict(resources) for resources in self._player_resources]
+        child._undo_log = None
+        child._threat_maps = {}
+        for player_index, threat_map in self._threat_maps.items():
+            child._threat_maps[player_index] = threat_map.copy(child.game_map)
+            child.game_map.add_observer(child._threat_maps[player_index].update)
+        child._shield_maps = {}
+        for player_index, shield_map in self._shield_maps.items():
+            child._shield_maps[player_index] = shield_map.copy(child.game_map)
+            child.game_map.add_observer(child._shield_maps[player_index].update)
+        return child
+
+    def savepoint(self):
+        """Marks a point that spawns, removals and upgrades can later be undone to with rollback
+
+        While a savepoint is active, attempt_spawn, attempt_remove, attempt_upgrade and the game_map
+        functions add_unit and remove_unit record what they change, so rolling back costs time
+        proportional to the number of changes. Savepoints can be nested.
+
+        Returns:
+            A savepoint to pass to rollback
+
+        """
+        if self._undo_log is None:
+            self._undo_log = []
+            self.game_map._journal = self._undo_log
+        return len(self._undo_log)
+
+    def rollback(self, savepoint):
+        """Undoes every change made since the given savepoint. The savepoint stays valid and can be rolled back to again.
+
+        Args:
+            savepoint: A value returned by savepoint since the last commit
+
+        """
+        if self._undo_log is None or savepoint > len(self._undo_log):
+            self.warn("Invalid savepoint {}. Savepoints are discarded by commit.".format(savepoint))
+            return
+        log = self._undo_log
+        while len(log) > savepoint:
+            entry = log.pop()
+            if entry[0] == "tile":
+                self.game_map._undo(entry)
+            elif entry[0] == "resource":
+                _, player_index, resource_key, held_resource = entry
+                self._player_resources[player_index][resource_key] = held_resource
+            else:
+                entry[1].pop()
+
+    def commit(self):
+        """Keeps every change made since the first active savepoint and stops recording them.
+        All savepoints are discarded.
+        """
+        self._undo_log = None
+        self.game_map._journal = None
+
+    def __push(self, stack, move):
+        if self._undo_log is not None:
+            self._undo_log.append(("stack", stack))
+        stack.append(move)
 
     def __resource_required(self, unit_type):
         return self.SP if is_stationary(unit_type) else self.MP
@@ -163,6 +272,8 @@ class GameState:
         elif resource_type == self.SP:
             resource_key = 'SP'
         held_resource = self.get_resource(resource_type, player_index)
+        if self._undo_log is not None:
+            self._undo_log.append(("resource", player_index, resource_key, held_resource))
         self._player_resources[player_index][resource_key] = held_resource + amount
 
     def _invalid_player_index(self, index):
@@ -333,7 +444,7 @@ class GameState:
         stationary = is_stationary(unit_type)
         blocked = self.contains_stationary_unit(location) or (stationary and len(self.game_map[location[0],location[1]]) > 0)
         correct_territory = location[1] < self.HALF_ARENA
-        on_edge = location in (self.game_map.get_edge_locations(self.game_map.BOTTOM_LEFT) + self.game_map.get_edge_locations(self.game_map.BOTTOM_RIGHT))
+        on_edge = (location[0], location[1]) in self.game_map.geometry.spawnable[0]
 
         if self.enable_warnings:
             fail_reason = ""
@@ -383,9 +494,9 @@ class GameState:
                     self.__set_resource(MP, 0 - costs[MP])
                     self.game_map.add_unit(unit_type, location, 0)
                     if is_stationary(unit_type):
-                        self._build_stack.append((unit_type, x, y))
+                        self.__push(self._build_stack, (unit_type, x, y))
                     else:
-                        self._deploy_stack.append((unit_type, x, y))
+                        self.__push(self._deploy_stack, (unit_type, x, y))
                     spawned_units += 1
                 else:
                     break
@@ -407,7 +518,7 @@ class GameState:
         for location in locations:
             if location[1] < self.HALF_ARENA and self.contains_stationary_unit(location):
                 x, y = map(int, location)
-                self._build_stack.append((REMOVE, x, y))
+                self.__push(self._build_stack, (REMOVE, x, y))
                 removed_units += 1
             else:
                 self.warn("Could not remove a unit from {}. Location has no structures or is enemy territory.".format(location))
@@ -428,12 +539,9 @@ class GameState:
             locations = [locations]
         spawned_units = 0
         for location in locations:
-            if location[1] < self.HALF_ARENA and self.contains_stationary_unit(location):
+            existing_unit = location[1] < self.HALF_ARENA and self.contains_stationary_unit(location)
+            if existing_unit:
                 x, y = map(int, location)
-                existing_unit = None
-                for unit in self.game_map[x,y]:
-                    if unit.stationary:
-                        existing_unit = unit
 
                 if not existing_unit.upgraded and self.config["unitInformation"][UNIT_TYPE_TO_INDEX[existing_unit.unit_type]].get("upgrade", None) is not None:
                     costs = self.type_cost(existing_unit.unit_type, True)
@@ -441,8 +549,8 @@ class GameState:
                     if resources[SP] >= costs[SP] and resources[MP] >= costs[MP]:
                         self.__set_resource(SP, 0 - costs[SP])
                         self.__set_resource(MP, 0 - costs[MP])
-                        existing_unit.upgrade()
-                        self._build_stack.append((UPGRADE, x, y))
+                        self.game_map._upgrade_structure(x, y)
+                        self.__push(self._build_stack, (UPGRADE, x, y))
                         spawned_units += 1
             else:
                 self.warn("Could not upgrade a unit from {}. Location has no structures or is enemy territory.".format(location))
@@ -494,6 +602,97 @@ class GameState:
         end_points = self.game_map.get_edge_locations(target_edge)
         return self._shortest_path_finder.navigate_multiple_endpoints(start_location, end_points, self)
 
+    def find_timed_path_to_edge(self, start_location, unit_type, target_edge=None, upgraded=False):
+        """Gets the path a unit of a given type would take, with the frame at which it reaches and leaves each tile.
+        Slower units spend more frames on each tile, and so more frames in range of the structures along the path.
+
+        Args:
+            start_location: The location of a hypothetical unit
+            unit_type: The type of the mobile unit, which sets its speed
+            target_edge: The edge the unit wants to reach. game_map.TOP_LEFT, game_map.BOTTOM_RIGHT, etc. Induced from start_location if None.
+            upgraded: If True, use the speed of the upgraded unit
+
+        Returns:
+            A TimedPath with the path, as given by find_path_to_edge, and the arrival, departure and
+            number of frames for each of its tiles. None if the start location is blocked.
+
+        """
+        stats = get_unit_stats(self.config).get(unit_type)
+        if stats is None or stats.stationary:
+            self.warn("Attempted to get the timed path of {}, which is not a mobile unit type".format(unit_type))
+            return
+        if upgraded:
+            stats = stats.upgraded_stats
+        if self.contains_stationary_unit(start_location):
+            self.warn("Attempted to perform pathing from blocked starting location {}".format(start_location))
+            return
+
+        if target_edge is None:
+            target_edge = self.get_target_edge(start_location)
+
+        end_points = self.game_map.get_edge_locations(target_edge)
+        return self._shortest_path_finder.navigate_timed(start_location, end_points, stats.speed, self)
+
+    def find_paths_to_edge(self, start_locations, target_edge=None):
+        """Gets the paths units at several locations would take, see find_path_to_edge.
+        Much faster than calling find_path_to_edge for each location, as units heading
+        for the same edge share the pathfinding work.
+
+        Args:
+            start_locations: The locations of hypothetical units
+            target_edge: The edge the units want to reach. Induced from each start location if None.
+
+        Returns:
+            A list with the path for each start location, in the same order.
+            The path is None for start locations that are blocked.
+
+        """
+        paths = [None] * len(start_locations)
+        edge_starts = {}
+        for order, start_location in enumerate(start_locations):
+            if self.contains_stationary_unit(start_location):
+                self.warn("Attempted to perform pathing from blocked starting location {}".format(start_location))
+                continue
+            edge = self.get_target_edge(start_location) if target_edge is None else target_edge
+            edge_starts.setdefault(edge, []).append(order)
+
+        for edge, orders in edge_starts.items():
+            end_points = self.game_map.get_edge_locations(edge)
+            edge_paths = self._shortest_path_finder.navigate_multiple_starts([start_locations[order] for order in orders], end_points, self)
+            for order, path in zip(orders, edge_paths):
+                paths[order] = path
+        return paths
+
+    def get_incremental_pathfinder(self):
+        """Gets an IncrementalPathfinder starting from the current structures. Use it to test many
+        hypothetical structure placements or removals without pathing from scratch for each one.
+
+        Returns:
+            A new IncrementalPathfinder, see navigation.py
+
+        """
+        return IncrementalPathfinder(self)
+
+    def find_critical_structures(self, start_location, target_edge=None):
+        """Finds the structures whose destruction would change the path a unit at a given location would take,
+        and the path it would take after each of them is destroyed. Much faster than pathing once per structure,
+        as the distance fields are only repaired around each destroyed structure.
+
+        Args:
+            start_location: The location of a hypothetical unit
+            target_edge: The edge the unit wants to reach. game_map.TOP_LEFT, game_map.BOTTOM_RIGHT, etc. Induced from start_location if None.
+
+        Returns:
+            A tuple (path, changes), path being the current path as given by find_path_to_edge and changes
+            a dict mapping the (x, y) location of each such structure to the path once it is destroyed.
+            None if start_location is blocked
+
+        """
+        if self.contains_stationary_unit(start_location):
+            self.warn("Attempted to perform pathing from blocked starting location {}".format(start_location))
+            return
+        return IncrementalPathfinder(self).find_critical_structures(start_location, target_edge)
+
     def contains_stationary_unit(self, location):
         """Check if a location is blocked, return structures unit if it is
 
@@ -508,10 +707,7 @@ class GameState:
             self.warn('Checked for stationary unit outside of arena bounds')
             return False
         x, y = map(int, location)
-        for unit in self.game_map[x,y]:
-            if unit.stationary:
-                return unit
-        return False
+        return self.game_map.get_structure(x * self.ARENA_SIZE + y) or False
 
     def warn(self, message):
         """ Used internally by game_state to print warnings
@@ -610,6 +806,116 @@ class GameState:
                     target_x_distance = unit_x_distance
         return target
 
+    def get_targets(self, attackers):
+        """Gets the target of several attacking units at once, see get_target. Much faster than calling get_target
+        for each of them, as the units of every tile in range are only looked up once, and each target is picked by
+        comparing one sort key per candidate instead of running the comparison chain of get_target.
+
+        The sort key orders candidates by the same priority as get_target: mobile units before structures,
+        then nearest, lowest health, lowest y (highest for the enemy's units) and furthest from the center in x.
+        Candidates that tie on every part keep the order get_target visits them in.
+
+        Args:
+            attackers: A list of GameUnits, for example every unit of a frame
+
+        Returns:
+            A list with the GameUnit each attacker would choose to attack, in the same order as attackers.
+            None for attackers with nothing in range.
+
+        """
+        game_map = self.game_map
+        size = self.ARENA_SIZE
+        center = self.HALF_ARENA - 0.5
+        occupied = bytearray(size * size)
+        owners = game_map.get_structure_owners()
+        for index in game_map.geometry.indices:
+            if owners[index] >= 0:
+                occupied[index] = 1
+        for player_index in (0, 1):
+            for unit_type in (SCOUT, DEMOLISHER, INTERCEPTOR):
+                for x, y in game_map.get_unit_locations(player_index, unit_type):
+                    occupied[x * size + y] = 1
+        # flat index -> (unit, player_index, stationary, health, y, negated x distance) of every unit on that tile
+        tiles = {}
+
+        targets = []
+        for attacking_unit in attackers:
+            if not isinstance(attacking_unit, GameUnit) or type(attacking_unit.x) is not int or type(attacking_unit.y) is not int:
+                targets.append(self.get_target(attacking_unit))
+                continue
+            attacker_x = attacking_unit.x
+            attacker_y = attacking_unit.y
+            attacker_index = attacking_unit.player_index
+            hits_structures = attacking_unit.damage_f != 0
+            hits_mobile = attacking_unit.damage_i != 0
+            y_sign = 1 if attacker_index == 0 else -1
+            target = None
+            target_key = None
+            for index in game_map.get_indices_in_range([attacker_x, attacker_y], attacking_unit.attackRange):
+                if not occupied[index]:
+                    continue
+                entries = tiles.get(index)
+                if entries is None:
+                    entries = tiles[index] = [(unit, unit.player_index, unit.stationary, unit.health, unit.y, -abs(center - unit.x))
+                                              for unit in game_map[index // size, index % size]]
+                distance = None
+                for unit, player_index, stationary, health, y, x_distance in entries:
+                    if player_index == attacker_index or (stationary and not hits_structures) or (not stationary and not hits_mobile):
+                        continue
+                    if distance is None:
+                        distance = math.sqrt((index // size - attacker_x) ** 2 + (index % size - attacker_y) ** 2)
+                    key = (stationary, distance, health, y * y_sign, x_distance)
+                    if target_key is None or key < target_key:
+                        target = unit
+                        target_key = key
+            targets.append(target)
+        return targets
+
+    def get_threat_map(self, player_index):
+        """Gets the number of attacking structures and their damage per frame on every tile, for units of a given player.
+        Use it instead of get_attackers to estimate the damage along many paths, see ThreatMap.path_damage.
+
+        The map is built on the first call, then kept up to date as units are spawned, removed or upgraded,
+        each change only costing time proportional to the range of the units on the changed tile.
+        The returned map always holds the current threat, so a placement search can read it after every spawn.
+
+        Args:
+            player_index: The index corresponding to the defending player, 0 for you 1 for the enemy
+
+        Returns:
+            A ThreatMap of the other player's units, see threat_map.py. Read only.
+
+        """
+        if not player_index == 0 and not player_index == 1:
+            self._invalid_player_index(player_index)
+        threat_map = self._threat_maps.get(player_index)
+        if threat_map is None:
+            threat_map = self._threat_maps[player_index] = ThreatMap(self.game_map, player_index)
+            self.game_map.add_observer(threat_map.update)
+        return threat_map
+
+    def get_shield_map(self, player_index):
+        """Gets the supports that would shield a mobile unit of a given player on every tile.
+        Use it to estimate the shield a unit picks up along a path, see ShieldMap.path_shield.
+
+        Like get_threat_map, the map is built on the first call, then kept up to date as structures are
+        spawned, removed or upgraded.
+
+        Args:
+            player_index: The index corresponding to the player whose units are shielded, 0 for you 1 for the enemy
+
+        Returns:
+            A ShieldMap of that player's supports, see shield_map.py. Read only.
+
+        """
+        if not player_index == 0 and not player_index == 1:
+            self._invalid_player_index(player_index)
+        shield_map = self._shield_maps.get(player_index)
+        if shield_map is None:
+            shield_map = self._shield_maps[player_index] = ShieldMap(self.game_map, player_index)
+            self.game_map.add_observer(shield_map.update)
+        return shield_map
+
     def get_attackers(self, location, player_index):
         """Gets the stationary units threatening a given location
 
@@ -631,11 +937,7 @@ class GameState:
         """
         Get locations in the range of TURRET units
         """
-        max_range = 0
-        for unit in self.config["unitInformation"]:
-            if unit.get('attackRange', 0) >= max_range:
-                max_range = unit.get('attackRange', 0)
-        possible_locations= self.game_map.get_locations_in_range(location, max_range)
+        possible_locations= self.game_map.get_locations_in_range(location, self._max_attack_range)
         for location_unit in possible_locations:
             for unit in self.game_map[location_unit]:
                 if unit.damage_i + unit.damage_f > 0 and unit.player_index != player_index and self.game_map.distance_between_locations(location, location_unit) <= unit.attackRange:
@@ -0,0 +1,180 @@
+import math
+from functools import lru_cache
+
+
+class ArenaGeometry:
+    """Lookup tables describing the diamond shaped arena, computed once per arena size.
+    Use get_geometry to get the shared instance instead of creating one.
+
+    Locations are stored as (x, y) tuples. A location's flat index is x * arena_size + y,
+    which is also the index used by the GameMap structure grids.
+
+    Attributes :
+        * arena_size (int): The size of the arena
+        * half_arena (int): Half the size of the arena
+        * bounds (bytearray): Indexed by flat index, 1 if the location is on the board, 0 otherwise
+        * row_bounds (tuple): For each y, the (first x, last x) of the board on that row
+        * locations (tuple): Every location on the board, row by row from the bottom, left to right
+        * indices (tuple): The flat index of every location, in the same order as locations
+        * location_index (dict): Maps every location on the board to its flat index
+        * board_order (tuple): Indexed by flat index, the position of each location in locations, -1 off the board
+        * half_indices (tuple): The flat indices of each player's half of the board, in board order
+        * row_indices (tuple): For each y, the flat indices of that row in board order
+        * column_indices (tuple): For each x, the flat indices of that column in board order
+        * edges (tuple): The four edges as tuples of locations, in the order of GameMap.get_edges
+        * edge_sets (tuple): The four edges as frozensets of locations
+        * spawnable (tuple): For each player index, the frozenset of edge locations that player can deploy mobile units on
+        * neighbors (tuple): Indexed by flat index, the flat indices of the adjacent locations on the board,
+          in the order up, down, right, left. Empty for locations off the board
+        * mirror (tuple): Indexed by flat index, the flat index of the location mirrored across the vertical center line
+
+    """
+    def __init__(self, arena_size):
+        self.arena_size = arena_size
+        self.half_arena = half = arena_size // 2
+
+        row_bounds = []
+        for y in range(arena_size):
+            row_size = y + 1 if y < half else arena_size - y
+            row_bounds.append((half - row_size, half + row_size - 1))
+        self.row_bounds = tuple(row_bounds)
+
+        self.bounds = bytearray(arena_size * arena_size)
+        locations = []
+        for y, (start_x, end_x) in enumerate(self.row_bounds):
+            for x in range(start_x, end_x + 1):
+                locations.append((x, y))
+                self.bounds[x * arena_size + y] = 1
+        self.locations = tuple(locations)
+        self.indices = tuple(x * arena_size + y for x, y in self.locations)
+        self.location_index = dict(zip(self.locations, self.indices))
+        board_order = [-1] * (arena_size * arena_size)
+        for order, index in enumerate(self.indices):
+            board_order[index] = order
+        self.board_order = tuple(board_order)
+        self.half_indices = (tuple(index for index in self.indices if index % arena_size < half),
+                             tuple(index for index in self.indices if index % arena_size >= half))
+        self.row_indices = tuple(tuple(index for index in self.indices if index % arena_size == y) for y in range(arena_size))
+        self.column_indices = tuple(tuple(index for index in self.indices if index // arena_size == x) for x in range(arena_size))
+
+        top_right = tuple((half + num, arena_size - 1 - num) for num in range(half))
+        top_left = tuple((half - 1 - num, arena_size - 1 - num) for num in range(half))
+        bottom_left = tuple((half - 1 - num, num) for num in range(half))
+        bottom_right = tuple((half + num, num) for num in range(half))
+        self.edges = (top_right, top_left, bottom_left, bottom_right)
+        self.edge_sets = tuple(frozenset(edge) for edge in self.edges)
+        self.spawnable = (self.edge_sets[2] | self.edge_sets[3], self.edge_sets[0] | self.edge_sets[1])
+
+        neighbors = [()] * (arena_size * arena_size)
+        for x, y in self.locations:
+            adjacent = ((x, y + 1), (x, y - 1), (x + 1, y), (x - 1, y))
+            neighbors[x * arena_size + y] = tuple(nx * arena_size + ny for nx, ny in adjacent if self.in_bounds(nx, ny))
+        self.neighbors = tuple(neighbors)
+        self.mirror = tuple((arena_size - 1 - index // arena_size) * arena_size + index % arena_size for index in range(arena_size * arena_size))
+
+    def in_bounds(self, x, y):
+        """Checks if integer coordinates are on the board
+
+        Args:
+            x: The x coordinate
+            y: The y coordinate
+
+        Returns:
+            True if [x, y] is inside the diamond shaped board
+
+        """
+        return 0 <= x < self.arena_size and 0 <= y < self.arena_size and self.bounds[x * self.arena_size + y] == 1
+
+
+@lru_cache(maxsize=None)
+def get_geometry(arena_size=28):
+    """Gets the shared ArenaGeometry for an arena size
+
+    Args:
+        arena_size: The size of the arena
+
+    Returns:
+        The ArenaGeometry for that size, built on the first call
+
+    """
+    return ArenaGeometry(arena_size)
+
+
+@lru_cache(maxsize=None)
+def get_idealness_ranks(direction, arena_size=28):
+    """Gets the idealness of every location for a unit heading towards an edge, see ShortestPathFinder._get_idealness.
+    Locations further towards the edge are more ideal, then the ones further along it.
+
+    Args:
+        direction: The (x, y) direction of the edge, for example (1, 1) for the top right, see ShortestPathFinder._get_direction_from_endpoints
+        arena_size: The size of the arena
+
+    Returns:
+        A tuple indexed by flat index of the idealness of each location. The end points themselves are not
+        special cased, they are always the most ideal locations.
+
+    """
+    direction_x, direction_y = direction
+    ranks = []
+    for index in range(arena_size * arena_size):
+        x, y = divmod(index, arena_size)
+        ranks.append(arena_size * (y if direction_y == 1 else arena_size - 1 - y) + (x if direction_x == 1 else arena_size - 1 - x))
+    return tuple(ranks)
+
+
+@lru_cache(maxsize=None)
+def get_range_stencil(radius, hit_radius):
+    """Gets the relative offsets of the locations in range of a unit, see GameMap.get_locations_in_range
+
+    Args:
+        radius: The range of the unit
+        hit_radius: The getHitRadius of the game config
+
+    Returns:
+        A tuple of (dx, dy) offsets whose distance is below radius + hit_radius, ordered by dx then dy
+
+    """
+    search_radius = math.ceil(radius)
+    offsets = range(-search_radius, search_radius + 1)
+    return tuple((dx, dy) for dx in offsets for dy in offsets if math.sqrt(dx ** 2 + dy ** 2) < radius + hit_radius)
+
+
+@lru_cache(maxsize=4096)
+def get_range_indices(index, radius, hit_radius, arena_size=28):
+    """Gets the flat indices of the locations on the board in range of a location, see GameMap.get_indices_in_range
+
+    Args:
+        index: The flat index of the center location, which must be on the board
+        radius: The radius of the search area
+        hit_radius: The getHitRadius of the game config
+        arena_size: The size of the arena
+
+    Returns:
+        A tuple of flat indices, in the order of get_range_stencil
+
+    """
+    bounds = get_geometry(arena_size).bounds
+    x, y = divmod(index, arena_size)
+    indices = []
+    for dx, dy in get_range_stencil(radius, hit_radius):
+        i = x + dx
+        j = y + dy
+        if 0 <= i < arena_size and 0 <= j < arena_size and bounds[i * arena_size + j]:
+            indices.append(i * arena_size + j)
+    return tuple(indices)
+
+
+@lru_cache(maxsize=None)
+def get_attack_stencil(attack_range):
+    """Gets the relative offsets of the locations a structure can attack, see GameState.get_attackers
+
+    Args:
+        attack_range: The attackRange of the structure
+
+    Returns:
+        A tuple of (dx, dy) offsets whose distance is at most attack_range, ordered by dx then dy
+
+    """
+    search_radius = math.ceil(attack_range)
+    offsets = range(-search_radius, search_radius + 1)
+    return tuple((dx, dy) for dx in offsets for dy in offsets if math.sqrt(dx ** 2 + dy ** 2) <= attack_range)
@@ -2,6 +2,11 @@ import heapq
 import math
 import sys
 import queue
+from array import array
+from collections import OrderedDict, deque, namedtuple
+from functools import lru_cache
+from .bitboard import Bitboard, bits_of, flood_fill_bits, get_masks, get_pockets, mirror_bits, neighbor_bits
+from .geometry import get_geometry, get_idealness_ranks
 from .util import debug_write
 
 class Node:
@@ -20,6 +25,526 @@ class Node:
         self.blocked = False
         self.pathlength = -1
 
+HORIZONTAL = 1
+VERTICAL = 2
+
+TimedPath = namedtuple("TimedPath", ["path", "arrivals", "departures", "frames"])
+TimedPath.__doc__ = """A path with the frame at which a unit reaches and leaves each of its tiles, see ShortestPathFinder.navigate_timed.
+
+    Attributes :
+        * path (list): The locations of the path, as given by navigate_multiple_endpoints
+        * arrivals (tuple): For each tile of the path, the frame the unit reaches it, 0 for the start
+        * departures (tuple): For each tile of the path, the frame the unit moves on. The unit scores or self destructs as
+          soon as it reaches the last tile, so the last departure is the last arrival
+        * frames (tuple): For each tile of the path, the number of frames the unit spends on it
+"""
+
+def get_path_timing(tiles, speed):
+    """Gets the frames at which a unit reaches and leaves each tile of a path, see TimedPath
+
+    Args:
+        tiles: The number of tiles in the path, including the start
+        speed: The speed of the unit, it moves once every 1 / speed frames
+
+    Returns:
+        The tuples (arrivals, departures, frames)
+
+    """
+    arrivals = tuple(math.ceil(step / speed - 1e-9) for step in range(tiles))
+    departures = arrivals[1:] + arrivals[-1:]
+    frames = tuple(departure - arrival for arrival, departure in zip(arrivals, departures))
+    return arrivals, departures, frames
+
+def walk_field(geometry, start_point, start, direction, blocked, pathlength, validated, generation):
+    """Walks a distance field from a start tile to a tile with pathlength 0, with the tie-breaking of ShortestPathFinder._get_path
+
+    Args:
+        * geometry: The ArenaGeometry of the field
+        * start_point: The starting location, the first entry of the path
+        * start: The flat index of start_point
+        * direction: The (x, y) direction of the target edge, see ShortestPathFinder._get_direction_from_endpoints
+        * blocked: A flat array in the format of GameMap.get_structure_owners, entries >= 0 are blocked
+        * pathlength: A flat list of distances to the target
+        * validated: A flat list of generations, pathlength is treated as -1 where it differs from generation
+        * generation: The current generation
+
+    Returns:
+        The path as a list of locations
+
+    """
+    size = geometry.arena_size
+    direction_x, direction_y = direction
+    neighbors = geometry.neighbors
+
+    path = [start_point]
+    current = start
+    move_direction = 0
+    while pathlength[current] != 0:
+        current_x, current_y = divmod(current, size)
+        ideal = current
+        ideal_x, ideal_y = current_x, current_y
+        best_pathlength = pathlength[current]
+        for neighbor in neighbors[current]:
+            if blocked[neighbor] >= 0:
+                continue
+            neighbor_pathlength = pathlength[neighbor] if validated[neighbor] == generation else -1
+            if neighbor_pathlength > best_pathlength:
+                continue
+            x, y = divmod(neighbor, size)
+            if neighbor_pathlength == best_pathlength:
+                #Same rules as ShortestPathFinder._better_direction
+                if move_direction == HORIZONTAL and x != ideal_x:
+                    better = current_y != y
+                elif move_direction == VERTICAL and y != ideal_y:
+                    better = current_x != x
+                elif move_direction == 0:
+                    better = current_y != y
+                elif y == ideal_y:
+                    better = x > ideal_x if direction_x == 1 else x < ideal_x
+                elif x == ideal_x:
+                    better = y > ideal_y if direction_y == 1 else y < ideal_y
+                else:
+                    better = True
+                if not better:
+                    continue
+            ideal = neighbor
+            ideal_x, ideal_y = x, y
+            best_pathlength = neighbor_pathlength
+
+        move_direction = VERTICAL if current_x == ideal_x else HORIZONTAL
+        path.append([ideal_x, ideal_y])
+        current = ideal
+    return path
+
+@lru_cache(maxsize=64)
+def get_distance_field(blocked_bits, seed_bits, arena_size=28):
+    """Gets the distance from every tile to the closest seed, see ShortestPathFinder._validate.
+
+    Fields are cached. The arena is symmetric about its vertical center line, so the field of a board
+    and its seeds is the mirror image of the field of the mirrored board and seeds. Of the two, only
+    the one with the smaller bits is searched, the other is mirrored from it. This also means that on a
+    board that is its own mirror image, the field to the left edge is the mirrored field to the right edge.
+
+    Args:
+        blocked_bits: The bits of the blocked tiles, see GameMap.get_blocked_signature
+        seed_bits: The bits of the tiles at distance 0, blocked seeds are ignored
+        arena_size: The size of the arena
+
+    Returns:
+        A tuple indexed by flat index of the number of steps to the closest seed, -1 for blocked tiles,
+        tiles off the board and tiles that can not reach a seed
+
+    """
+    geometry = get_geometry(arena_size)
+    mirrored_blocked = mirror_bits(blocked_bits, arena_size)
+    mirrored_seeds = mirror_bits(seed_bits, arena_size)
+    if (mirrored_blocked, mirrored_seeds) < (blocked_bits, seed_bits):
+        field = get_distance_field(mirrored_blocked, mirrored_seeds, arena_size)
+        return tuple(field[index] for index in geometry.mirror)
+
+    free = bytearray(arena_size * arena_size)
+    for index in geometry.indices:
+        if not blocked_bits >> index & 1:
+            free[index] = 1
+    field = [-1] * (arena_size * arena_size)
+    frontier = deque()
+    for index in geometry.indices:
+        if free[index] and seed_bits >> index & 1:
+            field[index] = 0
+            frontier.append(index)
+    neighbors = geometry.neighbors
+    while frontier:
+        current = frontier.popleft()
+        length = field[current] + 1
+        for neighbor in neighbors[current]:
+            if free[neighbor] and field[neighbor] < 0:
+                field[neighbor] = length
+                frontier.append(neighbor)
+    return tuple(field)
+
+def end_points_key(end_points):
+    """Gets a hashable key for a list of end points, used to cache paths and search tables
+    """
+    return tuple((point[0], point[1], isinstance(point, list)) for point in end_points)
+
+class FlatPathfinder:
+    """Pathfinding on preallocated flat arrays indexed by flat location index (x * ARENA_SIZE + y).
+
+    Gives exactly the same paths as the Node based search of ShortestPathFinder, but uses the
+    neighbor table of ArenaGeometry instead of building neighbor lists and checking bounds, the
+    structure owner grid of the GameMap as its blocked mask, and a list used as a fixed size queue
+    instead of queue.Queue. The idealness search looks the start's pocket up in the pocket labels of the board.
+    Buffers are never cleared: each search bumps a generation counter,
+    and a tile's pathlength is only valid while its stamp equals the current generation.
+
+    Attributes :
+        * geometry (:obj: ArenaGeometry): The geometry of the arena being searched
+        * generation (int): The current search generation, bumped by begin
+        * pathlength (list): Indexed by flat index, the distance to the target of the current search
+        * validated (list): Indexed by flat index, the generation in which pathlength was set
+
+    """
+    def __init__(self, geometry):
+        """
+        Args:
+            geometry: The ArenaGeometry to search
+
+        """
+        tiles = geometry.arena_size * geometry.arena_size
+        self.geometry = geometry
+        self.generation = 0
+        self.pathlength = [-1] * tiles
+        self.validated = [0] * tiles
+        self._frontier = [0] * tiles
+        self._always_valid = [0] * tiles
+        self._blocked = None
+        self._blocked_bits = 0
+        self._targets = {}
+        self._last_field = None
+
+    def begin(self, game_map, blocked=None, blocked_bits=None):
+        """Starts a new generation of searches on the current state of a map.
+        Distance fields computed within one generation are reused by every search of that generation,
+        so the map's structures must not change until the next call.
+
+        Args:
+            game_map: The GameMap to search
+            blocked: A flat array to use as the blocked mask instead of the map's structures, in the format of GameMap.get_structure_owners
+            blocked_bits: The bits of the blocked tiles of that mask, in the format of GameMap.get_blocked_signature
+
+        """
+        self.generation += 1
+        if blocked is None:
+            blocked, blocked_bits = game_map.get_structure_owners(), game_map.get_blocked_signature()
+        self._blocked = blocked
+        self._blocked_bits = blocked_bits
+        self._last_field = None
+
+    def navigate(self, start_point, end_points):
+        """Finds the path a unit would take to reach a set of endpoints, see ShortestPathFinder.navigate_multiple_endpoints.
+        The start point must not be blocked.
+
+        Args:
+            * start_point: The starting location of the unit
+            * end_points: The end points of the unit, should be a list of edge locations
+
+        Returns:
+            The path as a list of locations, starting with start_point
+
+        """
+        target = self._get_target(end_points)
+        size = self.geometry.arena_size
+        start = start_point[0] * size + start_point[1]
+        ideal, ideal_is_end = self._idealness_search(start, start_point in end_points, target)
+        if ideal_is_end:
+            #Pockets that reach the end points share the cached distance field of the end points
+            field = get_distance_field(self._blocked_bits, target[3], size)
+            return self._get_path(start_point, start, target, field, self._always_valid, 0)
+
+        #Self destruct fields only depend on the pocket, an earlier start point may have validated it already
+        if self.validated[start] != self.generation:
+            self._validate(ideal)
+        return self._get_path(start_point, start, target, self.pathlength, self.validated, self.generation)
+
+    def pathlength_at(self, x, y):
+        """Gets the pathlength of a location in the field of the last path found, -1 if it is blocked or was not reached
+        """
+        index = x * self.geometry.arena_size + y
+        if self._last_field is None or self._blocked[index] >= 0:
+            return -1
+        field, validated, generation = self._last_field
+        if validated[index] != generation:
+            return -1
+        return field[index]
+
+    def _get_target(self, end_points):
+        """Gets the end point indices, end point bits, direction and seed bits of a set of end points.
+        The seed bits hold every end point, the end point bits only those that can match a tile, see below.
+        """
+        key = end_points_key(end_points)
+        target = self._targets.get(key)
+        if target is None:
+            size = self.geometry.arena_size
+            half = self.geometry.half_arena
+            end_indices = tuple(dict.fromkeys(x * size + y for x, y, _ in key))
+            #Like the Node based search, only end points given as lists match the [x, y] tiles it compares them to
+            end_bits = bits_of(x * size + y for x, y, is_list in key if is_list)
+            x, y = end_points[0]
+            direction = (-1 if x < half else 1, -1 if y < half else 1)
+            target = self._targets[key] = (end_indices, end_bits, direction, bits_of(end_indices))
+        return target
+
+    def _idealness_search(self, start, start_is_end, target):
+        """Finds the most ideal tile in the pocket of the start, see ShortestPathFinder._idealness_search.
+        Pockets are labeled once per board and shared by every search on it, see bitboard.get_pockets.
+
+        Returns:
+            The flat index of the most ideal tile, and whether the end points are the most ideal tiles
+
+        """
+        if start_is_end:
+            return start, True
+        pockets = get_pockets(self._blocked_bits, self.geometry.arena_size)
+        pocket = pockets.label(start)
+        if pockets.bits[pocket] & target[1]:
+            return start, True
+        return pockets.most_ideal(pocket, target[2]), False
+
+    def _validate(self, ideal):
+        """Breadth first search setting the pathlengths of a self destruct pocket, from its ideal tile
+        """
+        neighbors = self.geometry.neighbors
+        blocked = self._blocked
+        pathlength = self.pathlength
+        validated = self.validated
+        frontier = self._frontier
+        generation = self.generation
+
+        pathlength[ideal] = 0
+        validated[ideal] = generation
+        frontier[0] = ideal
+        head, tail = 0, 1
+        while head < tail:
+            current = frontier[head]
+            head += 1
+            length = pathlength[current] + 1
+            for neighbor in neighbors[current]:
+                if blocked[neighbor] < 0 and validated[neighbor] != generation:
+                    pathlength[neighbor] = length
+                    validated[neighbor] = generation
+                    frontier[tail] = neighbor
+                    tail += 1
+
+    def _get_path(self, start_point, start, target, field, validated, generation):
+        """Walks a distance field from the start, see ShortestPathFinder._get_path
+        """
+        self._last_field = (field, validated, generation)
+        return walk_field(self.geometry, start_point, start, target[2], self._blocked, field, validated, generation)
+
+class IncrementalPathfinder:
+    """Keeps a distance field to each edge up to date while single tiles are blocked or unblocked,
+    so that the paths with a structure added or removed can be found without pathing from scratch.
+    A repair only visits the tiles whose distance to the edge changes.
+
+    The blocked tiles are copied from the map when the pathfinder is created, later changes to the
+    GameMap are not seen. Paths are the ones GameState.find_path_to_edge would give on a map with
+    the same blocked tiles.
+
+    Attributes :
+        * geometry (:obj: ArenaGeometry): The geometry of the arena
+        * blocked (array): The flat blocked mask in the format of GameMap.get_structure_owners, entries >= 0 are blocked
+        * blocked_bits (int): The bits of the blocked tiles, in the format of GameMap.get_blocked_signature
+
+    """
+    def __init__(self, game_state):
+        """
+        Args:
+            game_state: The GameState whose structures are the starting blocked tiles
+
+        """
+        self.game_state = game_state
+        self.geometry = game_state.game_map.geometry
+        self.blocked = array('b', game_state.game_map.get_structure_owners())
+        self.blocked_bits = game_state.game_map.get_blocked_signature()
+        self._masks = get_masks(self.geometry.arena_size)
+        size = self.geometry.arena_size
+        half = self.geometry.half_arena
+        self._end_points = [[list(location) for location in edge] for edge in self.geometry.edges]
+        self._end_indices = [tuple(x * size + y for x, y in edge) for edge in self.geometry.edges]
+        self._directions = [(-1 if edge[0][0] < half else 1, -1 if edge[0][1] < half else 1) for edge in self.geometry.edges]
+        self._fields = {}
+        self._always_valid = [0] * (size * size)
+        self._flat_pathfinder = None
+
+    def block(self, location):
+        """Marks a location as blocked, as if a structure was built there, and repairs the distance fields
+
+        Args:
+            location: The location to block
+
+        Returns:
+            True if the location was free, False if it was already blocked
+
+        """
+        index = location[0] * self.geometry.arena_size + location[1]
+        if self.blocked[index] >= 0:
+            return False
+        self.blocked[index] = 1
+        self.blocked_bits |= 1 << index
+        for field in self._fields.values():
+            self._repair_blocked(field, index)
+        return True
+
+    def unblock(self, location):
+        """Marks a location as free, as if its structure was removed, and repairs the distance fields
+
+        Args:
+            location: The location to free
+
+        Returns:
+            True if the location was blocked, False if it was already free
+
+        """
+        index = location[0] * self.geometry.arena_size + location[1]
+        if self.blocked[index] < 0:
+            return False
+        self.blocked[index] = -1
+        self.blocked_bits &= ~(1 << index)
+        for edge, field in self._fields.items():
+            if index in self._end_indices[edge]:
+                field[index] = 0
+            else:
+                lengths = [field[neighbor] for neighbor in self.geometry.neighbors[index] if field[neighbor] >= 0]
+                if not lengths:
+                    continue
+                field[index] = min(lengths) + 1
+            self._spread(field, deque([index]))
+        return True
+
+    def get_pathlength(self, location, target_edge):
+        """Gets the number of steps from a location to the closest tile of an edge
+
+        Args:
+            location: The location to measure from
+            target_edge: The edge to measure to, game_map.TOP_LEFT, game_map.BOTTOM_RIGHT, etc.
+
+        Returns:
+            The number of steps, or -1 if the location is blocked or can not reach the edge
+
+        """
+        return self._get_field(target_edge)[location[0] * self.geometry.arena_size + location[1]]
+
+    def find_path_to_edge(self, start_location, target_edge=None):
+        """Gets the path a unit would take on the current blocked tiles, see GameState.find_path_to_edge
+
+        Args:
+            start_location: The location of a hypothetical unit
+            target_edge: The edge the unit wants to reach. Induced from start_location if None.
+
+        Returns:
+            A list of locations, or None if start_location is blocked
+
+        """
+        x, y = start_location
+        start = x * self.geometry.arena_size + y
+        if self.blocked[start] >= 0:
+            return None
+        if target_edge is None:
+            target_edge = self.game_state.get_target_edge(start_location)
+
+        field = self._get_field(target_edge)
+        if field[start] >= 0:
+            return walk_field(self.geometry, [x, y], start, self._directions[target_edge], self.blocked, field, self._always_valid, 0)
+
+        #Self destruct paths depend on the whole pocket, so they are searched from scratch
+        if self._flat_pathfinder is None:
+            self._flat_pathfinder = FlatPathfinder(self.geometry)
+        self._flat_pathfinder.begin(self.game_state.game_map, self.blocked, self.blocked_bits)
+        return self._flat_pathfinder.navigate([x, y], self._end_points[target_edge])
+
+    def find_critical_structures(self, start_location, target_edge=None):
+        """Finds the blocked tiles whose removal would change the path from a location, and the path after each removal.
+        Only the blocked tiles bordering the start's pocket of pathable space can change its path, each of them
+        is unblocked in turn, the path found on the repaired fields, and the tile blocked again.
+
+        Args:
+            start_location: The location of a hypothetical unit
+            target_edge: The edge the unit wants to reach. Induced from start_location if None.
+
+        Returns:
+            A tuple (path, changes). path is the current path, see find_path_to_edge. changes is a dict mapping
+            each (x, y) blocked location whose removal changes the path to the path after its removal.
+            None if start_location is blocked
+
+        """
+        path = self.find_path_to_edge(start_location, target_edge)
+        if path is None:
+            return None
+        if target_edge is None:
+            target_edge = self.game_state.get_target_edge(start_location)
+
+        size = self.geometry.arena_size
+        changes = {}
+        for index in self._pocket_border(start_location[0] * size + start_location[1]):
+            x, y = divmod(index, size)
+            self.unblock([x, y])
+            new_path = self.find_path_to_edge(start_location, target_edge)
+            self.block([x, y])
+            if new_path != path:
+                changes[(x, y)] = new_path
+        return path, changes
+
+    def _pocket_border(self, start):
+        """Gets the blocked tiles adjacent to the pocket of pathable space around a free tile, in board order
+        """
+        masks = self._masks
+        pocket = flood_fill_bits(1 << start, masks.board & ~self.blocked_bits, masks)
+        border = Bitboard(neighbor_bits(pocket, masks) & self.blocked_bits, self.geometry.arena_size)
+        size = self.geometry.arena_size
+        return sorted((x * size + y for x, y in border), key=self.geometry.board_order.__getitem__)
+
+    def _get_field(self, edge):
+        """Gets the distance field of an edge, copied from the shared cache the first time, see get_distance_field
+        """
+        field = self._fields.get(edge)
+        if field is None:
+            field = self._fields[edge] = list(get_distance_field(self.blocked_bits, self._masks.edges[edge], self.geometry.arena_size))
+        return field
+
+    def _spread(self, field, frontier):
+        """Breadth first search lowering the distances around the tiles in the frontier
+        """
+        neighbors = self.geometry.neighbors
+        blocked = self.blocked
+        while frontier:
+            current = frontier.popleft()
+            length = field[current] + 1
+            for neighbor in neighbors[current]:
+                if blocked[neighbor] < 0 and (field[neighbor] < 0 or field[neighbor] > length):
+                    field[neighbor] = length
+                    frontier.append(neighbor)
+
+    def _repair_blocked(self, field, index):
+        """Repairs a distance field after a tile was blocked
+        """
+        length = field[index]
+        field[index] = -1
+        if length < 0:
+            return
+
+        #Find the tiles that no longer have a neighbor one step closer to the edge, layer by layer
+        neighbors = self.geometry.neighbors
+        blocked = self.blocked
+        lost = []
+        layer = [neighbor for neighbor in neighbors[index] if field[neighbor] == length + 1]
+        while layer:
+            next_layer = []
+            for tile in layer:
+                length = field[tile]
+                if length < 0:
+                    continue
+                if any(field[neighbor] == length - 1 for neighbor in neighbors[tile]):
+                    continue
+                field[tile] = -1
+                lost.append(tile)
+                next_layer.extend(neighbor for neighbor in neighbors[tile] if field[neighbor] == length + 1)
+            layer = next_layer
+
+        #Give the lost tiles their new distances, starting from the ones closest to the rest of the field
+        frontier = []
+        for tile in lost:
+            lengths = [field[neighbor] for neighbor in neighbors[tile] if field[neighbor] >= 0]
+            if lengths:
+                heapq.heappush(frontier, (min(lengths) + 1, tile))
+        while frontier:
+            length, tile = heapq.heappop(frontier)
+            if field[tile] >= 0:
+                continue
+            field[tile] = length
+            for neighbor in neighbors[tile]:
+                if field[neighbor] < 0 and blocked[neighbor] < 0:
+                    heapq.heappush(frontier, (length + 1, neighbor))
+
 """
 This class helps with pathfinding. We guarantee the results will
 be accurate, but top players may want to write their own pathfinding
@@ -31,15 +556,43 @@ class ShortestPathFinder:
     Attributes :
         * HORIZONTAL (int): A constant representing a horizontal movement
         * VERTICAL (int): A constant representing a vertical movement
+        * CACHED_BOARDS (int): How many distinct boards the path cache remembers paths for
+        * flat_engine (bool): If True (the default) searches run on a FlatPathfinder, otherwise on a grid of Nodes
 
         * game_state (:obj: GameState): The current gamestate
         * game_map (:obj: GameMap): The current gamemap
 
+    Paths are cached by the blocked tile signature of the board (see GameMap.get_blocked_signature),
+    the start location and the end points, so repeated queries on an unchanged board are a dictionary
+    lookup and any change to the structures on the board is picked up automatically.
+
     """
-    def __init__(self):
+    CACHED_BOARDS = 16
+
+    def __init__(self, path_cache=None):
+        """
+        Args:
+            path_cache: The path cache of another ShortestPathFinder to share, used by GameState.fork
+
+        """
         self.HORIZONTAL = 1
         self.VERTICAL = 2
         self.initialized = False
+        self.flat_engine = True
+        self.path_cache = OrderedDict() if path_cache is None else path_cache
+        self._flat_pathfinder = None
+
+    def _cached_paths(self, signature):
+        """Gets the paths cached for a board signature, evicting the least recently used board if the cache is full
+        """
+        paths = self.path_cache.get(signature)
+        if paths is None:
+            paths = self.path_cache[signature] = {}
+            if len(self.path_cache) > self.CACHED_BOARDS:
+                self.path_cache.popitem(last=False)
+        else:
+            self.path_cache.move_to_end(signature)
+        return paths
 
     def initialize_map(self, game_state):
         """Initializes the map
@@ -50,6 +603,7 @@ class ShortestPathFinder:
         #Initialize map 
         self.initialized = True
         self.game_state = game_state
+        self.geometry = game_state.game_map.geometry
         self.game_map = [[Node() for x in range(self.game_state.ARENA_SIZE)] for y in range(self.game_state.ARENA_SIZE)]
 
     def navigate_multiple_endpoints(self, start_point, end_points, game_state):
@@ -65,18 +619,103 @@ class ShortestPathFinder:
             Note that this path can change if a tower is destroyed during pathing, or if you or your enemy places structures.
 
         """
-        if game_state.contains_stationary_unit(start_point):
-            return
+        return self.navigate_multiple_starts([start_point], end_points, game_state)[0]
+
+    def navigate_timed(self, start_point, end_points, speed, game_state):
+        """Finds the path a unit would take to reach a set of endpoints, with the frames it reaches and leaves each tile.
+        The timing is cached with the path, for each speed.
 
+        Args:
+            * start_point: The starting location of the unit
+            * end_points: The end points of the unit, should be a list of edge locations
+            * speed: The speed of the unit, see GameUnit.speed
+            * game_state: The current game state
+
+        Returns:
+            A TimedPath, or None if start_point is blocked
+
+        """
+        path = self.navigate_multiple_endpoints(start_point, end_points, game_state)
+        if path is None:
+            return None
+        paths = self._cached_paths(game_state.game_map.get_blocked_signature())
+        key = (start_point[0], start_point[1], end_points_key(end_points), speed)
+        timing = paths.get(key)
+        if timing is None:
+            timing = paths[key] = get_path_timing(len(path), speed)
+        return TimedPath(path, *timing)
+
+    def navigate_multiple_starts(self, start_points, end_points, game_state):
+        """Finds the paths units at several start points would take to reach the same set of endpoints
+
+        Every start point in the same pocket of pathable space shares one distance field, and pockets
+        that touch the end points share the field seeded from the end points, so the pathlengths are
+        only computed once per pocket instead of once per start point.
+
+        Args:
+            * start_points: The starting locations of the units
+            * end_points: The end points of the units, should be a list of edge locations
+            * game_state: The current game state
+
+        Returns:
+            A list with the path for each start point, in the same order, see navigate_multiple_endpoints.
+            The path is None for start points that are blocked.
+
+        """
+        paths = self._cached_paths(game_state.game_map.get_blocked_signature())
+        end_key = end_points_key(end_points)
+        search = None
+        results = []
+        for start_point in start_points:
+            if game_state.contains_stationary_unit(start_point):
+                results.append(None)
+                continue
+
+            key = (start_point[0], start_point[1], end_key)
+            path = paths.get(key)
+            if path is None:
+                if search is None:
+                    search = self._begin_search(game_state)
+                path = paths[key] = tuple(map(tuple, search(start_point, end_points)))
+            results.append([list(location) for location in path])
+        return results
+
+    def _begin_search(self, game_state):
+        """Prepares a search engine for the current game state and returns its search function
+        """
+        if self.flat_engine:
+            if self._flat_pathfinder is None:
+                self._flat_pathfinder = FlatPathfinder(game_state.game_map.geometry)
+            self._flat_pathfinder.begin(game_state.game_map)
+            return self._flat_pathfinder.navigate
+
+        self._reset_nodes(game_state)
+        return self._node_search
+
+    def _reset_nodes(self, game_state):
         #Initialize map 
         self.initialize_map(game_state)
         #Fill in walls
-        for location in self.game_state.game_map:
-            if self.game_state.contains_stationary_unit(location):
-                self.game_map[location[0]][location[1]].blocked = True
-        #Do pathfinding
-        ideal_endpoints = self._idealness_search(start_point, end_points)
-        self._validate(ideal_endpoints, end_points)
+        for x, y in self.game_state.game_map.iter_structures():
+            self.game_map[x][y].blocked = True
+
+    def _node_search(self, start_point, end_points):
+        """Finds a path on the Node grid set up by initialize_map
+        """
+        if (start_point in end_points) != ([start_point[0], start_point[1]] in end_points):
+            #The start point only matches the end points because of its type, see FlatPathfinder.navigate
+            game_state = self.game_state
+            self._reset_nodes(game_state)
+            ideal_endpoints = self._idealness_search(start_point, end_points)
+            self._validate(ideal_endpoints, end_points)
+            path = self._get_path(start_point, end_points)
+            self._reset_nodes(game_state)
+            return path
+
+        #Do pathfinding, unless an earlier start point already validated this pocket
+        if self.game_map[start_point[0]][start_point[1]].pathlength == -1:
+            ideal_endpoints = self._idealness_search(start_point, end_points)
+            self._validate(ideal_endpoints, end_points)
         return self._get_path(start_point, end_points)
 
     def _idealness_search(self, start, end_points):
@@ -84,20 +723,25 @@ class ShortestPathFinder:
         Finds the most ideal tile in our 'pocket' of pathable space. 
         The edge if it is available, or the best self destruct location otherwise
         """
+        #Same values as _get_idealness, with the end points and the direction worked out once per search
+        ends = set(end_points_key(end_points))
+        ranks = get_idealness_ranks(tuple(self._get_direction_from_endpoints(end_points)), self.game_state.ARENA_SIZE)
+        size = self.game_state.ARENA_SIZE
+
         current = queue.Queue()
         current.put(start)
-        best_idealness = self._get_idealness(start, end_points)
+        best_idealness = sys.maxsize if (start[0], start[1], isinstance(start, list)) in ends else ranks[start[0] * size + start[1]]
         self.game_map[start[0]][start[1]].visited_idealness = True
         most_ideal = start
 
         while not current.empty():
             search_location = current.get()
             for neighbor in self._get_neighbors(search_location):
-                if not self.game_state.game_map.in_arena_bounds(neighbor) or self.game_map[neighbor[0]][neighbor[1]].blocked:
+                if not self.geometry.in_bounds(neighbor[0], neighbor[1]) or self.game_map[neighbor[0]][neighbor[1]].blocked:
                     continue
 
                 x, y = neighbor
-                current_idealness = self._get_idealness(neighbor, end_points)
+                current_idealness = sys.maxsize if (x, y, True) in ends else ranks[x * size + y]
 
                 if current_idealness > best_idealness:
                     best_idealness = current_idealness
@@ -181,7 +825,7 @@ class ShortestPathFinder:
             current_location = current.get()
             current_node = self.game_map[current_location[0]][current_location[1]]
             for neighbor in self._get_neighbors(current_location):
-                if not self.game_state.game_map.in_arena_bounds(neighbor) or self.game_map[neighbor[0]][neighbor[1]].blocked:
+                if not self.geometry.in_bounds(neighbor[0], neighbor[1]) or self.game_map[neighbor[0]][neighbor[1]].blocked:
                     continue
 
                 neighbor_node = self.game_map[neighbor[0]][neighbor[1]]
@@ -228,7 +872,7 @@ class ShortestPathFinder:
         best_pathlength = self.game_map[current_point[0]][current_point[1]].pathlength
         for neighbor in neighbors:
             #debug_write("Comparing champ {} and contender {}".format(ideal_neighbor, neighbor))
-            if not self.game_state.game_map.in_arena_bounds(neighbor) or self.game_map[neighbor[0]][neighbor[1]].blocked:
+            if not self.geometry.in_bounds(neighbor[0], neighbor[1]) or self.game_map[neighbor[0]][neighbor[1]].blocked:
                 continue
 
             new_best = False
@@ -293,15 +937,19 @@ class ShortestPathFinder:
         """Prints an ASCII version of the current game map for debug purposes
 
         """
-        if not self.initialized:
+        if self.flat_engine and self._flat_pathfinder is not None:
+            pathlength_at = self._flat_pathfinder.pathlength_at
+        elif self.initialized:
+            pathlength_at = lambda x, y: -1 if self.game_map[x][y].blocked else self.game_map[x][y].pathlength
+        else:
             debug_write("Attempted to print_map before pathfinder initialization. Use 'this_object.initialize_map(game_state)' to initialize the map first")
             return
 
         for y in range(28):
             for x in range(28):
-                node = self.game_map[x][28 - y - 1]
-                if not node.blocked and not node.pathlength == -1:
-                    self._print_justified(node.pathlength)
+                pathlength = pathlength_at(x, 28 - y - 1)
+                if not pathlength == -1:
+                    self._print_justified(pathlength)
                 else:
                     sys.stderr.write("   ")
             debug_write("")
@@ -0,0 +1,121 @@
+from .geometry import get_range_indices
+from .structure_map import StructureMap
+
+
+class ShieldMap(StructureMap):
+    """The supports of one player that would shield a mobile unit of that player on every tile of the board.
+    Built from one pass over the supports, so the shield a unit picks up along a path is a few set lookups
+    per tile instead of a range query per support, see path_shield.
+
+    A support shields each mobile unit once, when the unit first comes within its shield range, giving it
+    shieldPerUnit plus shieldBonusPerY for each row the support stands towards the enemy's side. Upgraded
+    supports use their upgraded range and shield. The shield then decays by the support's shieldDecay each frame.
+
+    Like ThreatMap, the map remembers what each tile adds, and update only replaces the shield of the tile
+    that changed. Register update with GameMap.add_observer to keep the map current.
+
+    Attributes :
+        * player_index (int): The player whose supports and mobile units are counted, 0 for you 1 for the enemy
+        * arena_size (int): The size of the arena
+        * game_map (:obj: GameMap): The map the supports are read from by update
+        * coverage (list): Indexed by flat index, the set of flat indices of the supports shielding that tile
+        * supports (dict): Maps the flat index of each shielding support to its (shield, decay per frame)
+
+    """
+    def __init__(self, game_map, player_index):
+        """
+        Args:
+            game_map: The GameMap holding the supports
+            player_index: The player whose units are shielded, 0 for you 1 for the enemy
+
+        """
+        super().__init__(game_map, player_index)
+        self.coverage = [set() for _ in range(self.arena_size * self.arena_size)]
+        self.supports = {}
+        # flat index of a support -> the flat indices it shields
+        self._targets = {}
+        self._hit_radius = game_map.config["unitInformation"][0].get('getHitRadius', 0)
+
+        for index in self._unit_indices(player_index, lambda stats: stats.stationary and stats.shieldPerUnit > 0 and stats.shieldRange > 0):
+            self.update(index)
+
+    def _copy_state(self, copy):
+        copy.coverage = [set(supports) for supports in self.coverage]
+        copy.supports = dict(self.supports)
+        copy._targets = dict(self._targets)
+
+    def update(self, index):
+        """Brings the shield of the structure on one tile up to date, after it was added, removed or upgraded
+
+        Args:
+            index: The flat index of the tile, see GameMap.get_location_index
+
+        """
+        game_map = self.game_map
+        support = None
+        if game_map.get_structure_owners()[index] == self.player_index:
+            stats = self._type_stats[game_map.get_structure_types()[index]][game_map.get_structure_upgrades()[index]]
+            if stats.shieldPerUnit > 0 and stats.shieldRange > 0:
+                y = index % self.arena_size
+                rows_forward = y if self.player_index == 0 else self.arena_size - 1 - y
+                support = (stats.shieldPerUnit + stats.shieldBonusPerY * rows_forward, stats.shieldDecay)
+                targets = get_range_indices(index, stats.shieldRange, self._hit_radius, self.arena_size)
+
+        if index in self.supports:
+            for target in self._targets.pop(index):
+                self.coverage[target].discard(index)
+            del self.supports[index]
+        if support is not None:
+            for target in targets:
+                self.coverage[target].add(index)
+            self.supports[index] = support
+            self._targets[index] = targets
+
+    def get_shield(self, location):
+        """Gets the shield a mobile unit of player_index would get from every support in range of a location
+        """
+        supports = self.supports
+        return sum(supports[support][0] for support in self.coverage[location[0] * self.arena_size + location[1]])
+
+    def path_supports(self, path):
+        """Gets the supports that would shield a unit following a path, in the order it comes within their range
+
+        Args:
+            path: A list of [x, y] locations, see GameState.find_path_to_edge
+
+        Returns:
+            A list of (flat index of the support, index in path of the tile where the unit is shielded)
+
+        """
+        size = self.arena_size
+        coverage = self.coverage
+        seen = set()
+        shields = []
+        for order, (x, y) in enumerate(path):
+            tile_supports = coverage[x * size + y]
+            if tile_supports and not tile_supports <= seen:
+                for support in sorted(tile_supports - seen):
+                    shields.append((support, order))
+                seen |= tile_supports
+        return shields
+
+    def path_shield(self, path, arrivals=None):
+        """Estimates the shield a mobile unit would pick up following a path
+
+        Args:
+            path: A list of [x, y] locations, see GameState.find_path_to_edge
+            arrivals: The frame the unit reaches each tile, see TimedPath. If given, each shield decays from the
+                frame it is picked up until the unit reaches the last tile, and what is left is counted
+
+        Returns:
+            The total shield
+
+        """
+        supports = self.supports
+        total = 0
+        for support, order in self.path_supports(path):
+            shield, decay = supports[support]
+            if arrivals is not None and decay:
+                shield = max(0, shield - decay * (arrivals[-1] - arrivals[order]))
+            total += shield
+        return total
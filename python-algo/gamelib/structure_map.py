@@ -0,0 +1,62 @@
+from .unit import get_unit_stats
+
+
+class StructureMap:
+    """The shared base of ThreatMap and ShieldMap, maps of the board built from the structures of one player
+    and kept current by registering their update with GameMap.add_observer.
+
+    Attributes :
+        * player_index (int): The player the map is about, 0 for you 1 for the enemy
+        * arena_size (int): The size of the arena
+        * game_map (:obj: GameMap): The map the units are read from by update
+
+    """
+    def __init__(self, game_map, player_index):
+        """
+        Args:
+            game_map: The GameMap holding the units
+            player_index: The player the map is about, 0 for you 1 for the enemy
+
+        """
+        self.player_index = player_index
+        self.arena_size = game_map.ARENA_SIZE
+        self.game_map = game_map
+        self._unit_stats = get_unit_stats(game_map.config)
+        # Indexed by the type index of the structure grids, the (base, upgraded) UnitStats of that type
+        self._type_stats = []
+        for unit in game_map.config["unitInformation"]:
+            stats = self._unit_stats.get(unit.get("shorthand"))
+            self._type_stats.append((stats, stats.upgraded_stats) if stats is not None else (None, None))
+
+    def copy(self, game_map):
+        """Copies this map for a fork of its GameMap, see GameMap.fork
+
+        Args:
+            game_map: The forked GameMap the copy follows
+
+        Returns:
+            A new map of the same class holding the same values
+
+        """
+        copy = self.__class__.__new__(self.__class__)
+        copy.__dict__.update(self.__dict__)
+        copy.game_map = game_map
+        self._copy_state(copy)
+        return copy
+
+    def _copy_state(self, copy):
+        """Gives a copy made by copy its own mutable containers. Overridden by the subclasses.
+        """
+        pass
+
+    def _unit_indices(self, player_index, unit_filter):
+        """Gets the flat indices of the units of a player whose base or upgraded UnitStats pass unit_filter,
+        from the unit index of the GameMap, in time proportional to the number of such units
+        """
+        size = self.arena_size
+        indices = set()
+        for unit_type, stats in self._unit_stats.items():
+            if unit_filter(stats) or unit_filter(stats.upgraded_stats):
+                for x, y in self.game_map.get_unit_locations(player_index, unit_type):
+                    indices.add(x * size + y)
+        return indices
@@ -1,11 +1,15 @@
 import unittest
+import importlib.util
 import json
 from .game_state import GameState
-from .unit import GameUnit
+from .unit import GameUnit, get_unit_stats, clear_unit_stats
+from .navigation import ShortestPathFinder, get_distance_field
+from .bitboard import Bitboard, get_pockets
+from .util import StateString
 
 class BasicTests(unittest.TestCase):
 
-    def make_turn_0_map(self):
+    def make_turn_0_map(self, turn_string=None, lazy=False):
         config = """
             {
             "seasonCompatibilityModeP1": 5,
@@ -188,7 +192,7 @@ class BasicTests(unittest.TestCase):
         """
         turn_0 = """{"p2Units":[[],[],[],[],[],[],[]],"turnInfo":[0,0,-1],"p1Stats":[30.0,25.0,5.0,0],"p1Units":[[],[],[],[],[],[],[]],"p2Stats":[30.0,25.0,5.0,0],"events":{"selfDestruct":[],"breach":[],"damage":[],"shield":[],"move":[],"spawn":[],"death":[],"attack":[],"melee":[]}}"""
         
-        state = GameState(json.loads(config), turn_0)
+        state = GameState(json.loads(config), turn_string or turn_0, lazy)
         state.suppress_warnings(True)
         return state
 
@@ -205,6 +209,12 @@ class BasicTests(unittest.TestCase):
         self.assertEqual(30, game.my_health, "My integrity is not working")
         self.assertEqual(30, game.enemy_health, "My opponent has no integrity!")
 
+    def test_parsed_state(self):
+        game = self.make_turn_0_map()
+        parsed = GameState(game.config, json.loads(game.serialized_string))
+        self.assertEqual(game.get_resources(1), parsed.get_resources(1), "A decoded state should parse like its string")
+        self.assertEqual(game.turn_number, parsed.turn_number, "A decoded state should parse like its string")
+
     def test_spawning(self):
         game = self.make_turn_0_map()
         self.assertEqual(True, game.attempt_spawn("SI", [[13, 0]]), "We cannot spawn a soldier!")
@@ -235,10 +245,78 @@ class BasicTests(unittest.TestCase):
             game.game_map.add_unit("FF", [13,13])
         self.assertEqual(1, len(game.game_map[13,13]), "Towers seem to be stacking")
         
+    def test_structure_grids(self):
+        game = self.make_turn_0_map()
+        index = game.game_map.get_location_index([13, 12])
+        self.assertFalse(game.game_map.is_blocked([13, 12]), "An empty tile should not be blocked")
+        game.game_map.add_unit("DF", [13, 12], 1)
+        self.assertTrue(game.game_map.is_blocked([13, 12]), "A turret should block its tile")
+        self.assertEqual(1, game.game_map.get_structure_owners()[index], "Wrong structure owner")
+        self.assertEqual(2, game.game_map.get_structure_types()[index], "Wrong structure type index")
+        self.assertEqual(90, game.game_map.get_structure_health()[index], "Wrong structure health")
+        game.game_map._upgrade_structure(13, 12)
+        self.assertEqual(1, game.game_map.get_structure_upgrades()[index], "Upgrade not recorded")
+        game.game_map.add_unit("EI", [13, 11])
+        self.assertFalse(game.game_map.is_blocked([13, 11]), "Mobile units should not block")
+        game.game_map.remove_unit([13, 12])
+        self.assertEqual(-1, game.game_map.get_structure_owners()[index], "Removed structure still in the grid")
+        self.assertFalse(game.contains_stationary_unit([13, 12]), "Removed structure still blocks")
+
+    def test_lazy_parsing(self):
+        turn = """{"p2Units":[[],[],[[13,15,40.0,"1"]],[],[],[],[],[[13,15,0.0,""]]],"turnInfo":[1,0,-1,3],"p1Stats":[30.0,25.0,5.0,0],"p1Units":[[[12,11,75.0,"2"]],[],[],[],[],[[12,12,40.0,"3"]],[[12,11,0.0,""]],[]],"p2Stats":[30.0,25.0,5.0,0],"events":{}}"""
+        eager = self.make_turn_0_map(turn)
+        lazy = self.make_turn_0_map(turn, True)
+        self.assertTrue(lazy.game_map.is_blocked([13, 15]), "Pending structures should block")
+        self.assertEqual(1, lazy.game_map.get_structure_upgrades()[lazy.game_map.get_location_index([13, 15])], "Pending upgrade not recorded")
+        self.assertEqual(list(eager.game_map.get_structure_health()), list(lazy.game_map.get_structure_health()), "Lazy structure health differs")
+        self.assertEqual([[12, 12]], lazy.game_map.get_unit_locations(0, "SI"), "Pending unit not indexed")
+        for location in ([13, 15], [12, 11], [12, 12], [13, 13]):
+            self.assertEqual(str(eager.game_map[location]), str(lazy.game_map[location]), "Lazy tile differs at {}".format(location))
+        self.assertTrue(lazy.game_map[12, 11][0].pending_removal, "Pending removal lost")
+
+    def test_geometry(self):
+        game = self.make_turn_0_map()
+        geometry = game.game_map.geometry
+        self.assertEqual(420, len(geometry.locations), "Wrong number of tiles on the board")
+        self.assertEqual([list(location) for location in geometry.locations], list(game.game_map), "Iteration order changed")
+        self.assertIn((0, 13), geometry.spawnable[0], "Bottom left corner should be spawnable")
+        self.assertNotIn((13, 13), geometry.spawnable[0], "Only edges should be spawnable")
+        self.assertEqual(geometry.edge_sets[1], set(map(tuple, game.game_map.get_edge_locations(game.game_map.TOP_LEFT))), "Edge tables disagree")
+
+    def test_region_iterators(self):
+        game = self.make_turn_0_map()
+        game.game_map.add_unit("FF", [13, 3], 0)
+        game.game_map.add_unit("DF", [13, 20], 1)
+        self.assertEqual([[13, 3], [13, 20]], list(game.game_map.iter_structures()), "Wrong structure locations")
+        self.assertEqual([[13, 20]], list(game.game_map.iter_structures(1)), "Wrong enemy structure locations")
+        self.assertEqual(210, len(list(game.game_map.iter_my_half())), "Wrong size for my half")
+        self.assertEqual([[13, 0], [14, 0], [12, 1]], list(game.game_map.iter_rows(0, 1))[:3], "Rows should be in board order")
+        self.assertEqual(56, len(list(game.game_map.iter_columns(13, 14))), "Wrong column band size")
+        outer = [location for location in game.game_map for _ in game.game_map]
+        self.assertEqual(420 * 420, len(outer), "Nested iterations should not interfere")
+
+    def test_unit_index(self):
+        game = self.make_turn_0_map()
+        for _ in range(3):
+            game.game_map.add_unit("EI", [13, 0], 1)
+        game.game_map.add_unit("DF", [13, 20], 1)
+        game.game_map.add_unit("DF", [10, 20], 1)
+        self.assertEqual(3, game.game_map.count_units(1, "EI"), "Mobile units should be counted one by one")
+        self.assertEqual([[13, 0]], game.game_map.get_unit_locations(1, "EI"), "Stacked units share a location")
+        game.game_map.remove_unit([13, 20])
+        self.assertEqual(1, game.game_map.count_units(1, "DF"), "Removed turret still indexed")
+        xs, ys = game.game_map.get_unit_coordinates(1, "DF")
+        self.assertEqual(([10], [20]), (list(xs), list(ys)), "Wrong turret coordinates")
+        self.assertEqual(0, game.game_map.count_units(0, "DF"), "Enemy turrets counted as mine")
+
     def test_get_units_in_range(self):
         game = self.make_turn_0_map()
         self.assertEqual(1, len(game.game_map.get_locations_in_range([13,13], 0)), "We should be in 0 range of ourself")
         self.assertEqual(37, len(game.game_map.get_locations_in_range([13,13], 3.5)), "Wrong number of tiles in range")
+        indices = game.game_map.get_indices_in_range([13, 1], 3.5)
+        locations = game.game_map.get_locations_in_range([13, 1], 3.5)
+        self.assertEqual([game.game_map.get_location_index(location) for location in locations], list(indices), "Index variant disagrees")
+        self.assertEqual(5, len(game.game_map.get_locations_in_range([13, 0], 1.5)), "Off board tiles should be filtered")
 
     def _test_get_attackers(self):
         game = self.make_turn_0_map()
@@ -256,6 +334,338 @@ class BasicTests(unittest.TestCase):
         game.game_map.add_unit("DF", [14,14], 1)
         self.assertEqual(3, len(game.get_attackers([13,13], 0)), "We should be in danger from 3 places")
 
+    def test_shared_unit_stats(self):
+        game = self.make_turn_0_map()
+        first = GameUnit("DF", game.config)
+        second = GameUnit("DF", game.config, 1, 10, 13, 13)
+        self.assertIs(first.stats, second.stats, "Units of one type should share their stats")
+        second.upgrade()
+        self.assertEqual(3.5, second.attackRange, "Upgraded range not applied")
+        self.assertEqual(2.5, first.attackRange, "Upgrading one unit changed another")
+        self.assertEqual([6.0, 0], second.cost, "Upgraded cost should include the base cost")
+        self.assertEqual(10, second.health, "Upgrading should not change health")
+
+    def test_fork(self):
+        game = self.make_turn_0_map()
+        game.game_map.add_unit("DF", [13, 5])
+        fork = game.fork()
+        fork.attempt_upgrade([13, 5])
+        fork.attempt_spawn("FF", [12, 5])
+        fork.game_map.remove_unit([13, 5])
+        self.assertTrue(game.contains_stationary_unit([13, 5]), "Removing on a fork changed the parent")
+        self.assertFalse(game.game_map[13, 5][0].upgraded, "Upgrading on a fork changed the parent")
+        self.assertFalse(game.contains_stationary_unit([12, 5]), "Spawning on a fork changed the parent")
+        self.assertEqual([], game._build_stack, "The fork's build stack leaked into the parent")
+        self.assertEqual(25, game.get_resource(game.SP), "The fork spent the parent's resources")
+        self.assertTrue(fork.contains_stationary_unit([12, 5]), "The fork lost its own spawn")
+
+    def test_savepoint_rollback(self):
+        game = self.make_turn_0_map()
+        game.attempt_spawn("DF", [13, 5])
+        savepoint = game.savepoint()
+        game.attempt_upgrade([13, 5])
+        game.attempt_spawn("FF", [12, 5])
+        game.attempt_remove([13, 5])
+        game.attempt_spawn("SI", [13, 0], 2)
+        game.rollback(savepoint)
+        self.assertEqual([("DF", 13, 5)], game._build_stack, "Build stack not rolled back")
+        self.assertEqual([], game._deploy_stack, "Deploy stack not rolled back")
+        self.assertEqual([23, 5], game.get_resources(), "Resources not rolled back")
+        self.assertFalse(game.game_map[13, 5][0].upgraded, "Upgrade not rolled back")
+        self.assertFalse(game.contains_stationary_unit([12, 5]), "Spawn not rolled back")
+        game.attempt_spawn("FF", [12, 5])
+        game.commit()
+        self.assertTrue(game.contains_stationary_unit([12, 5]), "Committed spawn lost")
+
+    def test_path_cache(self):
+        game = self.make_turn_0_map()
+        path = game.find_path_to_edge([13, 0])
+        self.assertEqual(path, game.find_path_to_edge([13, 0], game.game_map.TOP_RIGHT), "Cached path differs")
+        path[0][0] = -1
+        self.assertEqual([13, 0], game.find_path_to_edge([13, 0])[0], "Cached path was mutated")
+        signature = game.game_map.get_blocked_signature()
+        game.game_map.add_unit("FF", path[3])
+        self.assertNotEqual(signature, game.game_map.get_blocked_signature(), "Signature not updated")
+        self.assertNotIn(path[3], game.find_path_to_edge([13, 0]), "Path walks through a new wall")
+        game.game_map.remove_unit(path[3])
+        self.assertEqual(signature, game.game_map.get_blocked_signature(), "Signature not restored")
+
+    def test_find_paths_to_edge(self):
+        game = self.make_turn_0_map()
+        game.suppress_warnings(True)
+        game.game_map.add_unit("FF", [13, 5])
+        starts = [[13, 0], [14, 0], [3, 10], [13, 5], [24, 10]]
+        paths = game.find_paths_to_edge(starts)
+        self.assertIsNone(paths[3], "Got a path from a blocked location")
+        for start, path in zip(starts, paths):
+            if path is not None:
+                self.assertEqual(game.find_path_to_edge(start), path, "Batch path differs at {}".format(start))
+        self.assertEqual(game.find_paths_to_edge(starts[:2], game.game_map.TOP_LEFT)[0], game.find_path_to_edge([13, 0], game.game_map.TOP_LEFT), "Target edge ignored")
+
+    def test_flat_pathfinder(self):
+        game = self.make_turn_0_map()
+        for x in range(5, 23):
+            game.game_map.add_unit("FF", [x, 10])
+        starts = [location for location in game.game_map if not game.contains_stationary_unit(location)]
+        end_points = game.game_map.get_edge_locations(game.game_map.TOP_RIGHT)
+        flat = ShortestPathFinder()
+        nodes = ShortestPathFinder()
+        nodes.flat_engine = False
+        self.assertEqual(nodes.navigate_multiple_starts(starts, end_points, game), flat.navigate_multiple_starts(starts, end_points, game), "Engines disagree")
+        self.assertEqual((13 * 28 + 6, 13 * 28 + 4, 14 * 28 + 5, 12 * 28 + 5), game.game_map.geometry.neighbors[13 * 28 + 5], "Wrong neighbor order")
+
+    def test_incremental_pathfinder(self):
+        game = self.make_turn_0_map()
+        pathfinder = game.get_incremental_pathfinder()
+        self.assertEqual(28, pathfinder.get_pathlength([13, 0], game.game_map.TOP_RIGHT), "Wrong distance to the edge")
+        path = game.find_path_to_edge([13, 0])
+        self.assertEqual(path, pathfinder.find_path_to_edge([13, 0]), "Wrong path on an empty board")
+        for x in range(28):
+            pathfinder.block([x, 13])
+            game.game_map.add_unit("FF", [x, 13])
+        self.assertEqual(-1, pathfinder.get_pathlength([13, 0], game.game_map.TOP_RIGHT), "Edge should be cut off")
+        self.assertEqual(game.find_path_to_edge([13, 0]), pathfinder.find_path_to_edge([13, 0]), "Wrong self destruct path")
+        for x in range(28):
+            pathfinder.unblock([x, 13])
+        self.assertEqual(path, pathfinder.find_path_to_edge([13, 0]), "Path not repaired")
+
+    def test_critical_structures(self):
+        game = self.make_turn_0_map()
+        for x in range(28):
+            game.game_map.add_unit("FF", [x, 13])
+        path, changes = game.find_critical_structures([13, 0])
+        self.assertEqual(game.find_path_to_edge([13, 0]), path, "Wrong current path")
+        self.assertIn((13, 13), changes, "Opening the wall should change the path")
+        game.game_map.remove_unit([13, 13])
+        self.assertEqual(game.find_path_to_edge([13, 0]), changes[(13, 13)], "Wrong replacement path")
+        game.suppress_warnings(True)
+        self.assertIsNone(game.find_critical_structures([12, 13]), "Blocked start should have no path")
+
+    def test_bitboard(self):
+        game = self.make_turn_0_map()
+        for x in range(28):
+            game.game_map.add_unit("FF", [x, 13])
+        blocked = Bitboard.from_game_map(game.game_map)
+        self.assertEqual(28, len(blocked), "Wrong number of blocked locations")
+        self.assertIn([0, 13], blocked, "Blocked location missing")
+        free = ~blocked
+        self.assertEqual(420 - 28, len(free), "Complement should stay on the board")
+        self.assertEqual([[13, 0], [13, 1], [14, 0]], sorted(Bitboard.from_locations([[13, 0]]).neighbors() | Bitboard.from_locations([[13, 0]])), "Wrong neighbors")
+        self.assertEqual(2, len(free.pockets()), "The wall should split the board in two")
+        self.assertFalse(free.reaches([[13, 0]], Bitboard.edge(game.game_map.TOP_RIGHT)), "Edge should be cut off")
+        self.assertTrue((free | Bitboard.from_locations([[5, 13]])).reaches([[13, 0]], Bitboard.edge(game.game_map.TOP_RIGHT)), "Gap should open the edge")
+
+    def test_pocket_labels(self):
+        game = self.make_turn_0_map()
+        for x in range(28):
+            game.game_map.add_unit("FF", [x, 13])
+        pockets = get_pockets(game.game_map.get_blocked_signature())
+        bottom = pockets.label(13 * 28 + 0)
+        self.assertEqual(bottom, pockets.label(1 * 28 + 12), "Same pocket labeled twice")
+        self.assertNotEqual(bottom, pockets.label(13 * 28 + 27), "Wall should split the pockets")
+        self.assertEqual(26 * 28 + 12, pockets.most_ideal(bottom, (1, 1)), "Wrong most ideal tile")
+        self.assertEqual(pockets, get_pockets(game.game_map.get_blocked_signature()), "Labels not shared")
+        self.assertEqual([26, 12], game.find_path_to_edge([13, 0])[-1], "Self destruct path should end on the most ideal tile")
+
+    @unittest.skipIf(importlib.util.find_spec("numpy") is None, "NumPy is not installed")
+    def test_vectorized_path_lengths(self):
+        from . import vectorized
+        game = self.make_turn_0_map()
+        for x in range(28):
+            game.game_map.add_unit("FF", [x, 13])
+        starts = [[13, 0], [14, 0], [5, 8]]
+        masks = vectorized.stack_candidate_masks(game.game_map, [[13, 13], [13, 5]])
+        lengths, self_destructs = vectorized.batch_path_lengths(masks, starts)
+        self.assertEqual([True] * 3, list(self_destructs[0]), "The wall should cut off every edge")
+        self.assertEqual([False] * 3, list(self_destructs[1]), "The gap should open the edges")
+        for board, location in enumerate([None, [13, 13], [13, 5]]):
+            if location == [13, 13]:
+                game.game_map.remove_unit(location)
+            elif location is not None:
+                game.game_map.add_unit("FF", location)
+            for start, length in zip(starts, lengths[board]):
+                self.assertEqual(len(game.find_path_to_edge(start)) - 1, length, "Wrong path length from {} on board {}".format(start, board))
+            if location == [13, 13]:
+                game.game_map.add_unit("FF", location)
+
+    def test_timed_path(self):
+        game = self.make_turn_0_map()
+        path = game.find_path_to_edge([13, 0])
+        scout = game.find_timed_path_to_edge([13, 0], "PI")
+        interceptor = game.find_timed_path_to_edge([13, 0], "SI")
+        self.assertEqual(path, interceptor.path, "Timed path differs")
+        self.assertEqual(len(path), len(interceptor.arrivals), "One arrival per tile")
+        self.assertEqual((0, 1, 2), scout.arrivals[:3], "Scouts move every frame")
+        self.assertEqual((0, 4, 8), interceptor.arrivals[:3], "Interceptors move every 4 frames")
+        self.assertEqual((4, 4, 0), (interceptor.frames[0], interceptor.departures[0], interceptor.frames[-1]), "Wrong frames on tile")
+        self.assertIs(interceptor.arrivals, game.find_timed_path_to_edge([13, 0], "SI").arrivals, "Timing not cached")
+        game.suppress_warnings(True)
+        self.assertIsNone(game.find_timed_path_to_edge([13, 0], "FF"), "Structures have no timed path")
+
+    def test_mirror_symmetry(self):
+        game = self.make_turn_0_map()
+        mirrored = self.make_turn_0_map()
+        game.game_map.add_unit("FF", [10, 5], 0)
+        mirrored.game_map.add_unit("FF", [17, 5], 0)
+        self.assertEqual(game.game_map.get_canonical_signature()[0], mirrored.game_map.get_canonical_signature()[0], "Mirrored boards differ")
+        self.assertNotEqual(game.game_map.get_canonical_signature()[1], mirrored.game_map.get_canonical_signature()[1], "Both boards canonical")
+        self.assertEqual(Bitboard.from_locations([[17, 5]]), Bitboard.from_locations([[10, 5]]).mirror(), "Wrong mirror")
+
+        game.game_map.add_unit("FF", [17, 5], 0)
+        bits = game.game_map.get_blocked_signature()
+        edges = game.game_map.get_edges()
+        left = get_distance_field(bits, Bitboard.from_locations(edges[game.game_map.TOP_LEFT]).bits)
+        right = get_distance_field(bits, Bitboard.from_locations(edges[game.game_map.TOP_RIGHT]).bits)
+        self.assertEqual(left[10 * 28 + 6], right[17 * 28 + 6], "Fields not mirrored")
+        self.assertEqual(game.find_path_to_edge([17, 3], game.game_map.TOP_LEFT), ShortestPathFinder().navigate_multiple_endpoints([17, 3], edges[game.game_map.TOP_LEFT], game), "Mirrored field changed path")
+
+    def test_threat_map(self):
+        game = self.make_turn_0_map()
+        game.game_map.add_unit("DF", [13, 16], 1)
+        game.game_map.add_unit("DF", [13, 18], 1)
+        game.game_map._upgrade_structure(13, 18)
+        game.game_map.add_unit("FF", [14, 16], 1)
+        threat_map = game.get_threat_map(0)
+        for location in ([13, 13], [13, 14], [15, 15], [10, 18]):
+            self.assertEqual(len(game.get_attackers(location, 0)), threat_map.get_attacker_count(location), "Wrong attackers at {}".format(location))
+        self.assertEqual(20, threat_map.get_damage([13, 15]), "Upgraded damage not counted")
+        self.assertEqual(0, threat_map.get_damage([13, 15], stationary=True), "Turrets do not attack structures")
+        self.assertEqual(30, threat_map.path_damage([[13, 13], [13, 14], [13, 15]], [1, 2, 1]), "Wrong path damage")
+        self.assertIs(threat_map, game.get_threat_map(0), "Threat map not reused")
+        game.game_map.remove_unit([13, 18])
+        self.assertEqual(1, game.get_threat_map(0).get_attacker_count([13, 15]), "Threat map not rebuilt")
+
+    def test_threat_map_updates(self):
+        game = self.make_turn_0_map()
+        game._player_resources[0]['SP'] = 30
+        threat_map = game.get_threat_map(1)
+        savepoint = game.savepoint()
+        game.attempt_spawn("DF", [13, 11])
+        self.assertEqual(1, threat_map.get_attacker_count([13, 13]), "Spawn not counted")
+        self.assertEqual(0, threat_map.get_attacker_count([13, 14]), "Base range exceeded")
+        game.attempt_upgrade([13, 11])
+        self.assertEqual(1, threat_map.get_attacker_count([13, 14]), "Upgrade not counted")
+        fork = game.fork()
+        fork.game_map.remove_unit([13, 11])
+        self.assertEqual(0, fork.get_threat_map(1).get_attacker_count([13, 13]), "Removal not counted on fork")
+        self.assertEqual(1, threat_map.get_attacker_count([13, 13]), "Fork changed the original")
+        game.rollback(savepoint)
+        self.assertEqual(0, threat_map.get_attacker_count([13, 13]), "Rollback not counted")
+        self.assertEqual([0] * len(threat_map.attackers), list(threat_map.attackers), "Threat left behind")
+
+    def test_get_targets(self):
+        game = self.make_turn_0_map()
+        game.game_map.add_unit("DF", [13, 12], 0)
+        game.game_map.add_unit("DF", [14, 12], 0)
+        game.game_map.add_unit("FF", [13, 14], 1)
+        game.game_map.add_unit("FF", [14, 14], 1)
+        game.game_map.add_unit("PI", [12, 14], 1)
+        game.game_map.add_unit("PI", [15, 14], 1)
+        game.game_map.add_unit("EI", [14, 15], 1)
+        attackers = [unit for location in game.game_map for unit in game.game_map[location]]
+        expected = [game.get_target(unit) for unit in attackers]
+        self.assertEqual(expected, game.get_targets(attackers), "Batched targets differ")
+        self.assertIs(game.game_map[12, 14][0], game.get_targets(game.game_map[13, 12])[0], "Mobile units come first")
+
+    def test_shield_map(self):
+        config = json.loads(json.dumps(self.make_turn_0_map().config))
+        config["unitInformation"][1].update({"shieldRange": 3.5, "shieldPerUnit": 3.0, "upgrade": {"shieldRange": 7, "shieldPerUnit": 5, "shieldBonusPerY": 0.3}})
+        game = GameState(config, self.make_turn_0_map().serialized_string)
+        game.game_map.add_unit("EF", [13, 5], 0)
+        shield_map = game.get_shield_map(0)
+        per_unit = game.game_map[13, 5][0].shieldPerUnit
+        bonus = game.game_map[13, 5][0].stats.upgraded_stats.shieldBonusPerY
+        path = [[13, 3], [13, 4], [14, 4], [14, 3]]
+        self.assertEqual(per_unit, shield_map.path_shield(path), "A support shields once")
+        self.assertEqual(0, game.get_shield_map(1).path_shield(path), "Enemy units shielded by our support")
+        game.game_map._upgrade_structure(13, 5)
+        upgraded = game.game_map[13, 5][0].shieldPerUnit + bonus * 5
+        self.assertEqual(upgraded, shield_map.path_shield(path), "Upgrade not counted")
+        game.game_map.add_unit("EF", [14, 2], 0)
+        self.assertEqual([(13 * 28 + 5, 0), (14 * 28 + 2, 0)], shield_map.path_supports(path), "Wrong supports")
+        game.game_map.remove_unit([13, 5])
+        self.assertEqual(per_unit, shield_map.path_shield(path), "Removal not counted")
+
+    def test_coverage_index(self):
+        game = self.make_turn_0_map()
+        game.game_map.add_unit("DF", [13, 11], 0)
+        game.game_map.add_unit("DF", [15, 11], 0)
+        game.game_map.add_unit("FF", [14, 11], 0)
+        threat_map = game.get_threat_map(1)
+        self.assertEqual([[13, 11], [15, 11]], threat_map.get_covering_structures([14, 12]), "Wrong covering structures")
+        self.assertIn([13, 13], threat_map.get_covered_locations([13, 11]), "Wrong covered locations")
+        self.assertEqual([], threat_map.get_covered_locations([14, 11]), "Walls cover nothing")
+        self.assertEqual({13 * 28 + 11, 15 * 28 + 11}, threat_map.path_structures([[12, 13], [16, 13]]), "Wrong path structures")
+        lost = threat_map.coverage_loss([[13, 11]])
+        self.assertIn(11 * 28 + 11, lost, "Tile only covered by the removed turret")
+        self.assertNotIn(14 * 28 + 12, lost, "Tile still covered by the other turret")
+        game.game_map.remove_unit([15, 11])
+        self.assertIn(14 * 28 + 12, threat_map.coverage_loss([[13, 11]]), "Index not updated")
+
+    def test_fork_isolation(self):
+        game = self.make_turn_0_map()
+        game.game_map.add_unit("DF", [13, 5])
+        game.game_map.add_unit("FF", [12, 5])
+        fork = game.fork()
+        fork.game_map[13, 5][0].health = 1
+        fork.game_map[12, 5].clear()
+        self.assertNotEqual(1, game.game_map[13, 5][0].health, "Editing a unit of a fork changed the parent")
+        self.assertEqual(1, len(game.game_map[12, 5]), "Clearing a tile of a fork changed the parent")
+        self.assertTrue(game.contains_stationary_unit([12, 5]), "Clearing a tile of a fork unblocked the parent")
+        self.assertEqual(1, fork.game_map[13, 5][0].health, "The fork lost its own edit")
+        fork = game.fork()
+        fork.contains_stationary_unit([13, 5]).upgrade()
+        self.assertFalse(game.game_map[13, 5][0].upgraded, "Upgrading a structure of a fork changed the parent")
+
+    def test_tile_edit_sync(self):
+        game = self.make_turn_0_map()
+        game.game_map.add_unit("FF", [13, 5])
+        savepoint = game.savepoint()
+        game.game_map[13, 5].clear()
+        self.assertFalse(game.contains_stationary_unit([13, 5]), "Clearing a tile left it blocked")
+        game.game_map[12, 5].append(GameUnit("DF", game.config, 0, None, 12, 5))
+        self.assertTrue(game.contains_stationary_unit([12, 5]), "Appending a structure did not block its tile")
+        self.assertEqual([[12, 5]], game.game_map.get_unit_locations(0, "DF"), "Appended unit not indexed")
+        game.rollback(savepoint)
+        self.assertTrue(game.contains_stationary_unit([13, 5]), "Clearing a tile was not rolled back")
+        self.assertFalse(game.contains_stationary_unit([12, 5]), "Appending a unit was not rolled back")
+
+    def test_state_string(self):
+        game = self.make_turn_0_map()
+        turn = game.serialized_string
+        message = StateString(turn, json.loads(turn))
+        self.assertEqual(json.loads(turn), json.loads(message), "A StateString no longer decodes like its message")
+        self.assertEqual(turn, GameState(game.config, message).serialized_string, "serialized_string lost the message")
+        decoded = GameState(game.config, json.loads(turn)).serialized_string
+        self.assertEqual(json.loads(turn), json.loads(decoded), "serialized_string of a decoded state does not round trip")
+
+    def test_unit_stats_refresh(self):
+        game = self.make_turn_0_map()
+        config = json.loads(json.dumps(game.config))
+        self.assertEqual(get_unit_stats(config)["DF"].attackRange, GameUnit("DF", config).attackRange)
+        config["unitInformation"][2]["attackRange"] = 7
+        clear_unit_stats()
+        self.assertEqual(7, get_unit_stats(config)["DF"].attackRange, "Stats not rebuilt after the config changed")
+        self.assertEqual(7, GameUnit("DF", config).attackRange, "Unit built from stale stats")
+
+    def test_bitboard_subset(self):
+        small = Bitboard.from_locations([[13, 0], [13, 1]])
+        large = Bitboard.from_locations([[13, 0], [13, 1], [14, 1]])
+        self.assertTrue(small <= large and small < large, "Subset not detected")
+        self.assertTrue(large >= small and large > small, "Superset not detected")
+        self.assertTrue(small <= small and not small < small, "A set is a subset but not a strict subset of itself")
+        self.assertFalse(large <= small, "Superset reported as a subset")
+
+    def test_rollback_lazy_observer(self):
+        turn = """{"p2Units":[[],[],[[13,15,40.0,"1"]],[],[],[],[],[]],"turnInfo":[1,0,-1,3],"p1Stats":[30.0,25.0,5.0,0],"p1Units":[[],[],[],[],[],[],[],[]],"p2Stats":[30.0,25.0,5.0,0],"events":{}}"""
+        game = self.make_turn_0_map(turn, True)
+        game.game_map.add_observer(lambda index: game.game_map[divmod(index, game.ARENA_SIZE)])
+        savepoint = game.savepoint()
+        game.game_map._upgrade_structure(13, 15)
+        game.rollback(savepoint)
+        self.assertEqual(savepoint, len(game._undo_log), "Reading a pending tile during rollback was journaled")
+        self.assertFalse(game.game_map[13, 15][0].upgraded, "Upgrade not rolled back")
+
     def test_print_unit(self):
         game = self.make_turn_0_map()
 
@@ -0,0 +1,220 @@
+from array import array
+from functools import lru_cache
+from .geometry import get_attack_stencil, get_geometry
+from .structure_map import StructureMap
+
+
+@lru_cache(maxsize=None)
+def get_attack_targets(index, attack_range, arena_size=28):
+    """Gets the flat indices of the locations on the board a unit at a flat index can attack, see get_attack_stencil
+    """
+    bounds = get_geometry(arena_size).bounds
+    x, y = divmod(index, arena_size)
+    targets = []
+    for dx, dy in get_attack_stencil(attack_range):
+        i = x + dx
+        j = y + dy
+        if 0 <= i < arena_size and 0 <= j < arena_size and bounds[i * arena_size + j]:
+            targets.append(i * arena_size + j)
+    return tuple(targets)
+
+
+class ThreatMap(StructureMap):
+    """The threat the units of one player pose to the units of the other, for every tile of the board.
+    Built from one pass over the attacking units, so looking up a tile or summing the threat along a path
+    costs a few array reads instead of a range query per tile, see GameState.get_attackers.
+
+    A unit threatens the tiles whose distance from it is at most its attack range, with its upgraded
+    range and damage if it is upgraded. Like get_attackers, the mobile units on the map are counted where
+    they stand, at the start of a turn there are usually none.
+
+    The map remembers what each tile adds, so when the units of a tile change, update only takes away
+    their old threat and adds the new one, in time proportional to their range. Register update with
+    GameMap.add_observer to keep the map current as units are added, removed and upgraded.
+
+    It also indexes which structure covers which tile, in both directions, so questions like which structures
+    cover a path, or which tiles lose all coverage if some structures are removed, are set operations.
+    Structures are identified by their flat index, see GameMap.get_location_index.
+
+    Attributes :
+        * player_index (int): The defending player, 0 for you 1 for the enemy. The units of the other player are counted
+        * arena_size (int): The size of the arena
+        * game_map (:obj: GameMap): The map the threat is read from by update
+        * attackers (array): Indexed by flat index, the number of units that can attack a unit of player_index on that tile
+        * damage_to_mobile (array): Indexed by flat index, the damage per frame those units deal to a mobile unit on that tile
+        * damage_to_structures (array): Indexed by flat index, the damage per frame they deal to a structure on that tile
+        * coverage (list): Indexed by flat index, the set of flat indices of the attacking structures covering that tile
+        * covered (dict): Maps the flat index of each attacking structure to the flat indices of the tiles it covers
+
+    """
+    def __init__(self, game_map, player_index):
+        """
+        Args:
+            game_map: The GameMap holding the units
+            player_index: The defending player, 0 for you 1 for the enemy
+
+        """
+        super().__init__(game_map, player_index)
+        tiles = self.arena_size * self.arena_size
+        self.attackers = array('H', [0]) * tiles
+        self.damage_to_mobile = array('d', [0.0]) * tiles
+        self.damage_to_structures = array('d', [0.0]) * tiles
+        # flat index -> the UnitStats of the attacking units on that tile, as last added to the arrays
+        self._sources = {}
+        self.coverage = [set() for _ in range(tiles)]
+        self.covered = {}
+
+        self._mobile_types = tuple(unit_type for unit_type, stats in self._unit_stats.items() if not stats.stationary and stats.damage_i + stats.damage_f > 0)
+
+        for index in self._unit_indices(1 - player_index, lambda stats: stats.damage_i + stats.damage_f > 0):
+            self.update(index)
+
+    def _copy_state(self, copy):
+        copy.attackers = self.attackers[:]
+        copy.damage_to_mobile = self.damage_to_mobile[:]
+        copy.damage_to_structures = self.damage_to_structures[:]
+        copy._sources = dict(self._sources)
+        copy.coverage = [set(structures) for structures in self.coverage]
+        copy.covered = dict(self.covered)
+
+    def update(self, index):
+        """Brings the threat of the units on one tile up to date, after they were added, removed or upgraded
+
+        Args:
+            index: The flat index of the tile, see GameMap.get_location_index
+
+        """
+        game_map = self.game_map
+        attacker_index = 1 - self.player_index
+        sources = ()
+        owner = game_map.get_structure_owners()[index]
+        if owner == attacker_index:
+            stats = self._type_stats[game_map.get_structure_types()[index]][game_map.get_structure_upgrades()[index]]
+            if stats.damage_i + stats.damage_f > 0:
+                sources = (stats,)
+        if any(game_map.count_units(attacker_index, unit_type) for unit_type in self._mobile_types):
+            for unit in game_map[divmod(index, self.arena_size)]:
+                if unit.player_index == attacker_index and unit.unit_type in self._mobile_types:
+                    sources += (unit.stats,)
+
+        old_sources = self._sources.get(index, ())
+        if sources == old_sources:
+            return
+        for stats in old_sources:
+            self.__spread(index, stats, -1)
+        for stats in sources:
+            self.__spread(index, stats, 1)
+        if sources:
+            self._sources[index] = sources
+        else:
+            self._sources.pop(index, None)
+
+        if index in self.covered:
+            for target in self.covered.pop(index):
+                self.coverage[target].discard(index)
+        if sources and sources[0].stationary:
+            targets = self.covered[index] = get_attack_targets(index, sources[0].attackRange, self.arena_size)
+            for target in targets:
+                self.coverage[target].add(index)
+
+    def __spread(self, index, stats, sign):
+        """Adds, or takes away if sign is -1, the threat of one unit standing at a flat index
+        """
+        attackers = self.attackers
+        damage_to_mobile = self.damage_to_mobile
+        damage_to_structures = self.damage_to_structures
+        damage_i = stats.damage_i * sign
+        damage_f = stats.damage_f * sign
+        for target in get_attack_targets(index, stats.attackRange, self.arena_size):
+            attackers[target] += sign
+            damage_to_mobile[target] += damage_i
+            if damage_f:
+                damage_to_structures[target] += damage_f
+
+    def get_attacker_count(self, location):
+        """Gets the number of units that can attack a unit of player_index at a location, len(GameState.get_attackers)
+        """
+        return self.attackers[location[0] * self.arena_size + location[1]]
+
+    def get_damage(self, location, stationary=False):
+        """Gets the damage per frame a unit of player_index would take at a location
+
+        Args:
+            location: The [x, y] location of the unit
+            stationary: If True, the damage to a structure, otherwise to a mobile unit
+
+        """
+        damage = self.damage_to_structures if stationary else self.damage_to_mobile
+        return damage[location[0] * self.arena_size + location[1]]
+
+    def get_covering_structures(self, location):
+        """Gets the locations of the structures that can attack a unit of player_index at a location
+        """
+        size = self.arena_size
+        return [[index // size, index % size] for index in sorted(self.coverage[location[0] * size + location[1]])]
+
+    def get_covered_locations(self, location):
+        """Gets the locations a structure can attack, empty if there is no attacking structure at the location
+        """
+        size = self.arena_size
+        return [[index // size, index % size] for index in self.covered.get(location[0] * size + location[1], ())]
+
+    def path_structures(self, path):
+        """Gets the structures that can attack a unit somewhere along a path
+
+        Args:
+            path: A list of [x, y] locations, see GameState.find_path_to_edge
+
+        Returns:
+            A set of the flat indices of the structures
+
+        """
+        size = self.arena_size
+        coverage = self.coverage
+        structures = set()
+        for x, y in path:
+            structures |= coverage[x * size + y]
+        return structures
+
+    def coverage_loss(self, locations):
+        """Gets the tiles that would no longer be covered by any structure if some structures were removed or destroyed
+
+        Args:
+            locations: The [x, y] locations of the structures, for example the ones passed to GameState.attempt_remove
+
+        Returns:
+            A set of the flat indices of the tiles covered by at least one of those structures and by no other structure
+
+        """
+        size = self.arena_size
+        removed = {x * size + y for x, y in locations} & self.covered.keys()
+        coverage = self.coverage
+        return {target for structure in removed for target in self.covered[structure] if coverage[target] <= removed}
+
+    def path_attacker_count(self, path):
+        """Sums the number of units that can attack each tile of a path
+
+        Args:
+            path: A list of [x, y] locations, see GameState.find_path_to_edge
+
+        """
+        size = self.arena_size
+        attackers = self.attackers
+        return sum(attackers[x * size + y] for x, y in path)
+
+    def path_damage(self, path, frames=None):
+        """Estimates the damage a mobile unit would take following a path
+
+        Args:
+            path: A list of [x, y] locations, see GameState.find_path_to_edge
+            frames: The number of frames spent on each tile, see TimedPath. One frame per tile if None
+
+        Returns:
+            The sum of the damage per frame of every tile of the path, weighted by frames
+
+        """
+        size = self.arena_size
+        damage = self.damage_to_mobile
+        if frames is None:
+            return sum(damage[x * size + y] for x, y in path)
+        return sum(damage[x * size + y] * tile_frames for (x, y), tile_frames in zip(path, frames))
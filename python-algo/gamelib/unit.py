@@ -1,3 +1,6 @@
+from collections import namedtuple
+
+
 def is_stationary(unit_type, structure_types):
     """
         Args:
@@ -9,6 +12,63 @@ def is_stationary(unit_type, structure_types):
     return unit_type in structure_types
 
 
+UnitStats = namedtuple("UnitStats", ["unit_type", "config", "stationary", "speed", "damage_f", "damage_i",
+                                     "attackRange", "shieldRange", "max_health", "shieldPerUnit", "shieldBonusPerY", "shieldDecay",
+                                     "cost", "upgraded_stats"])
+UnitStats.__doc__ = """The immutable stats shared by every unit of one type, base or upgraded. See GameUnit for the fields."""
+
+# (config, templates) of the last config get_unit_stats was called with
+_last_stats = (None, None)
+
+
+def get_unit_stats(config):
+    """Gets the shared stat templates of every unit type in a config
+
+    Templates are reused by every GameUnit created with the same config object. Only the last config is remembered.
+    Call clear_unit_stats after changing a config in place, or its old templates keep being used.
+
+    Args:
+        config: The game config
+
+    Returns:
+        A dict mapping each unit type shorthand to its base UnitStats. The upgraded stats are in upgraded_stats.
+
+    """
+    global _last_stats
+    if _last_stats[0] is config:
+        return _last_stats[1]
+
+    templates = {}
+    for type_config in config["unitInformation"]:
+        if "shorthand" not in type_config:
+            continue
+        unit_type = type_config["shorthand"]
+        cost = (type_config.get("cost1", 0), type_config.get("cost2", 0))
+        base = [unit_type, config, type_config.get("unitCategory") == 0,
+                type_config.get("speed", 0), type_config.get("attackDamageTower", 0), type_config.get("attackDamageWalker", 0),
+                type_config.get("attackRange", 0), type_config.get("shieldRange", 0), type_config.get("startHealth", 0),
+                type_config.get("shieldPerUnit", 0), type_config.get("shieldBonusPerY", 0), type_config.get("shieldDecay", 0), cost]
+        upgrade_config = type_config.get("upgrade", {})
+        upgraded = UnitStats(unit_type, config, base[2],
+                             upgrade_config.get("speed", base[3]), upgrade_config.get("attackDamageTower", base[4]),
+                             upgrade_config.get("attackDamageWalker", base[5]), upgrade_config.get("attackRange", base[6]),
+                             upgrade_config.get("shieldRange", base[7]), upgrade_config.get("startHealth", base[8]),
+                             upgrade_config.get("shieldPerUnit", base[9]), upgrade_config.get("shieldBonusPerY", base[10]),
+                             upgrade_config.get("shieldDecay", base[11]),
+                             (upgrade_config.get("cost1", 0) + cost[0], upgrade_config.get("cost2", 0) + cost[1]), None)
+        templates[unit_type] = UnitStats(*base, upgraded)
+
+    _last_stats = (config, templates)
+    return templates
+
+
+def clear_unit_stats():
+    """Forgets the templates built by get_unit_stats, so the next call rebuilds them from the config
+    """
+    global _last_stats
+    _last_stats = (None, None)
+
+
 class GameUnit:
     """Holds information about a Unit. 
 
@@ -28,49 +88,72 @@ class GameUnit:
         * health (float): The current health of this unit
         * cost ([int, int]): The resource costs of this unit first is SP second is MP
         * shieldPerUnit (float): how much shield is given per unit
+        * shieldBonusPerY (float): how much more shield is given for each row the unit stands towards the enemy's side
+        * shieldDecay (float): how much of the shield given by this unit is lost each frame
         * pending_removal (boolean): If this unit is marked for removal by its owner
         * upgraded (boolean): If this unit is upgraded
 
+    The type dependent attributes are read from a UnitStats template shared by all units
+    of the same type, so they are read only.
+
     """
+    __slots__ = ("unit_type", "player_index", "x", "y", "health", "pending_removal", "upgraded", "stats")
+
     def __init__(self, unit_type, config, player_index=None, health=None, x=-1, y=-1):
         """ Initialize unit variables using args passed
 
         """
         self.unit_type = unit_type
-        self.config = config
         self.player_index = player_index
         self.pending_removal = False
         self.upgraded = False
         self.x = x
         self.y = y
-        self.__serialize_type()
-        self.health = self.max_health if not health else health
-
-    def __serialize_type(self):
-        from .game_state import STRUCTURE_TYPES, UNIT_TYPE_TO_INDEX, SUPPORT
-        type_config = self.config["unitInformation"][UNIT_TYPE_TO_INDEX[self.unit_type]]
-        self.stationary = type_config["unitCategory"] == 0
-        self.speed = type_config.get("speed", 0)
-        self.damage_f = type_config.get("attackDamageTower", 0)
-        self.damage_i = type_config.get("attackDamageWalker", 0)
-        self.attackRange = type_config.get("attackRange", 0)
-        self.shieldRange = type_config.get("shieldRange", 0)
-        self.max_health = type_config.get("startHealth", 0)
-        self.shieldPerUnit = type_config.get("shieldPerUnit", 0)
-        self.cost = [type_config.get("cost1", 0), type_config.get("cost2", 0)]
+        self.stats = get_unit_stats(config)[unit_type]
+        self.health = self.stats.max_health if not health else health
+
+    @classmethod
+    def from_stats(cls, stats, player_index, health, x, y):
+        """Fast constructor from a UnitStats template, see get_unit_stats
+
+        Args:
+            stats: The UnitStats of the new unit. Pass stats.upgraded_stats for an upgraded unit.
+            player_index: The player that controls the unit
+            health: The current health of the unit, or None for its max health
+            x: The x coordinate of the unit
+            y: The y coordinate of the unit
+
+        Returns:
+            A new GameUnit
+
+        """
+        unit = cls.__new__(cls)
+        unit.unit_type = stats.unit_type
+        unit.player_index = player_index
+        unit.pending_removal = False
+        unit.upgraded = stats.upgraded_stats is None
+        unit.x = x
+        unit.y = y
+        unit.stats = stats
+        unit.health = stats.max_health if not health else health
+        return unit
 
+    config = property(lambda self: self.stats.config)
+    stationary = property(lambda self: self.stats.stationary)
+    speed = property(lambda self: self.stats.speed)
+    damage_f = property(lambda self: self.stats.damage_f)
+    damage_i = property(lambda self: self.stats.damage_i)
+    attackRange = property(lambda self: self.stats.attackRange)
+    shieldRange = property(lambda self: self.stats.shieldRange)
+    max_health = property(lambda self: self.stats.max_health)
+    shieldPerUnit = property(lambda self: self.stats.shieldPerUnit)
+    shieldBonusPerY = property(lambda self: self.stats.shieldBonusPerY)
+    shieldDecay = property(lambda self: self.stats.shieldDecay)
+    cost = property(lambda self: list(self.stats.cost))
 
     def upgrade(self):
-        from .game_state import UNIT_TYPE_TO_INDEX
-        type_config = self.config["unitInformation"][UNIT_TYPE_TO_INDEX[self.unit_type]].get("upgrade", {})
-        self.speed = type_config.get("speed", self.speed)
-        self.damage_f = type_config.get("attackDamageTower", self.damage_f)
-        self.damage_i = type_config.get("attackDamageWalker", self.damage_i)
-        self.attackRange = type_config.get("attackRange", self.attackRange)
-        self.shieldRange = type_config.get("shieldRange", self.shieldRange)
-        self.max_health = type_config.get("startHealth", self.max_health)
-        self.shieldPerUnit = type_config.get("shieldPerUnit", self.shieldPerUnit)
-        self.cost = [type_config.get("cost1", 0) + self.cost[0], type_config.get("cost2", 0) + self.cost[1]]
+        if self.stats.upgraded_stats is not None:
+            self.stats = self.stats.upgraded_stats
         self.upgraded = True
 
 
@@ -21,6 +21,20 @@ def get_command():
         exit()
     return ret
 
+class StateString(str):
+    """A game state message exactly as received from the game engine, with the dict it decodes to.
+    It is a str, so code that calls json.loads on it keeps working, while GameState reads
+    the state attribute instead of parsing the message a second time.
+
+    Attributes :
+        * state (dict): The message decoded from json, or None if it was not decoded yet
+
+    """
+    def __new__(cls, message, state=None):
+        string = super().__new__(cls, message)
+        string.state = state
+        return string
+
 def send_command(cmd):
     """Sends your turn to standard output.
     Should usually only be called by 'GameState.submit_turn()'
@@ -0,0 +1,165 @@
+"""
+Distance fields for many hypothetical boards at once, computed with NumPy.
+
+A planner that scores the current board plus every candidate wall or removal can stack the blocked
+masks of all those boards and expand the BFS frontiers of every board together, one NumPy operation
+per step, instead of pathing once per board. The results match ShortestPathFinder.
+
+NumPy is an optional dependency, it is only imported when one of these functions is called.
+Blocked masks are boolean arrays indexed [board, x, y], like game_map[x][y].
+"""
+from .geometry import get_geometry, get_idealness_ranks
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("gamelib.vectorized needs NumPy, install it with 'pip install numpy'")
+    return numpy
+
+
+def get_blocked_mask(game_map):
+    """Gets the blocked mask of a map's current structures
+
+    Args:
+        game_map: The GameMap to read
+
+    Returns:
+        A (ARENA_SIZE, ARENA_SIZE) boolean array, True where a structure stands
+
+    """
+    np = _numpy()
+    size = game_map.ARENA_SIZE
+    owners = np.frombuffer(game_map.get_structure_owners(), dtype=np.int8)
+    return (owners >= 0).reshape(size, size)
+
+
+def stack_candidate_masks(game_map, locations):
+    """Stacks the blocked mask of a map with one hypothetical board per candidate location.
+    Board 0 is the current board, board i + 1 is the current board with locations[i] toggled:
+    blocked if it is free, as if a wall was built there, or free if it is blocked, as if its structure was removed.
+
+    Args:
+        game_map: The GameMap holding the current structures
+        locations: The candidate [x, y] locations
+
+    Returns:
+        A (len(locations) + 1, ARENA_SIZE, ARENA_SIZE) boolean array
+
+    """
+    np = _numpy()
+    base = get_blocked_mask(game_map)
+    masks = np.repeat(base[np.newaxis], len(locations) + 1, axis=0)
+    for board, (x, y) in enumerate(locations, 1):
+        masks[board, x, y] = not base[x, y]
+    return masks
+
+
+def _board_mask(np, arena_size):
+    board = np.zeros(arena_size * arena_size, dtype=bool)
+    board[list(get_geometry(arena_size).indices)] = True
+    return board.reshape(arena_size, arena_size)
+
+
+def _bfs(np, free, seeds):
+    """Breadth first search of every board at once
+
+    Args:
+        free: (N, ARENA_SIZE, ARENA_SIZE) boolean array of the tiles that may be walked on
+        seeds: boolean array of the same shape, the tiles at distance 0. Seeds that are not free are ignored
+
+    Returns:
+        An int array of the same shape, the distance of each tile from the closest seed, -1 where it can not be reached
+
+    """
+    distances = np.full(free.shape, -1, dtype=np.int16)
+    frontier = seeds & free
+    distances[frontier] = 0
+    step = 0
+    while frontier.any():
+        step += 1
+        grown = np.zeros_like(frontier)
+        grown[:, :, 1:] |= frontier[:, :, :-1]
+        grown[:, :, :-1] |= frontier[:, :, 1:]
+        grown[:, 1:, :] |= frontier[:, :-1, :]
+        grown[:, :-1, :] |= frontier[:, 1:, :]
+        frontier = grown & free & (distances < 0)
+        distances[frontier] = step
+    return distances
+
+
+def distance_fields(blocked, target_edge):
+    """Computes the distance from every tile of every board to an edge, see ShortestPathFinder._validate
+
+    Args:
+        blocked: (N, ARENA_SIZE, ARENA_SIZE) boolean array of blocked masks
+        target_edge: game_map.TOP_RIGHT, game_map.BOTTOM_LEFT, etc.
+
+    Returns:
+        An int16 array of the same shape, the number of steps from each tile to the edge,
+        -1 for blocked tiles, tiles off the board and tiles that can not reach the edge
+
+    """
+    np = _numpy()
+    blocked = np.asarray(blocked, dtype=bool)
+    arena_size = blocked.shape[1]
+    free = ~blocked & _board_mask(np, arena_size)
+    seeds = np.zeros_like(free)
+    for x, y in get_geometry(arena_size).edges[target_edge]:
+        seeds[:, x, y] = True
+    return _bfs(np, free, seeds)
+
+
+def batch_path_lengths(blocked, start_locations, target_edge=None):
+    """Gets the number of steps a unit at each start location would take on each board, and if it would self destruct.
+
+    A unit that can reach its edge takes as many steps as its distance to the edge. A unit that can not
+    walks to the most ideal tile of its pocket, see ShortestPathFinder._idealness_search, and self destructs there.
+
+    Args:
+        blocked: (N, ARENA_SIZE, ARENA_SIZE) boolean array of blocked masks, see stack_candidate_masks
+        start_locations: The [x, y] locations of hypothetical units
+        target_edge: The edge the units want to reach. Induced from each start location if None, see GameState.get_target_edge
+
+    Returns:
+        A tuple (path_lengths, self_destructs) of (N, len(start_locations)) arrays. path_lengths holds the number
+        of steps of each path, len(path) - 1 for the path find_path_to_edge would give, or -1 where the start
+        location is blocked. self_destructs is True where the unit can not reach its edge.
+
+    """
+    np = _numpy()
+    blocked = np.asarray(blocked, dtype=bool)
+    boards, arena_size = blocked.shape[0], blocked.shape[1]
+    geometry = get_geometry(arena_size)
+    half = geometry.half_arena
+    starts = np.array(start_locations, dtype=np.intp).reshape(-1, 2)
+    if target_edge is None:
+        #Same as GameState.get_target_edge
+        left = starts[:, 0] < half
+        bottom = starts[:, 1] < half
+        edges = np.where(left, np.where(bottom, 0, 3), np.where(bottom, 1, 2))
+    else:
+        edges = np.full(len(starts), target_edge)
+
+    path_lengths = np.full((boards, len(starts)), -1, dtype=np.int16)
+    for edge in np.unique(edges):
+        columns = np.nonzero(edges == edge)[0]
+        fields = distance_fields(blocked, int(edge))
+        path_lengths[:, columns] = fields[:, starts[columns, 0], starts[columns, 1]]
+
+    #Units that can not reach their edge walk to the most ideal tile of their pocket
+    start_blocked = blocked[:, starts[:, 0], starts[:, 1]] | ~_board_mask(np, arena_size)[starts[:, 0], starts[:, 1]]
+    self_destructs = (path_lengths < 0) & ~start_blocked
+    board_index, start_index = np.nonzero(self_destructs)
+    if len(board_index):
+        free = ~blocked[board_index] & _board_mask(np, arena_size)
+        seeds = np.zeros_like(free)
+        seeds[np.arange(len(board_index)), starts[start_index, 0], starts[start_index, 1]] = True
+        distances = _bfs(np, free, seeds).reshape(len(board_index), -1)
+        half_edges = [geometry.edges[edge][0] for edge in range(4)]
+        ranks = np.array([get_idealness_ranks((-1 if x < half else 1, -1 if y < half else 1), arena_size) for x, y in half_edges])
+        pair_ranks = np.where(distances >= 0, ranks[edges[start_index]], -1)
+        ideal = pair_ranks.argmax(axis=1)
+        path_lengths[board_index, start_index] = distances[np.arange(len(board_index)), ideal]
+    return path_lengths, self_destructs